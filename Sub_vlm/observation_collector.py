@@ -8,6 +8,8 @@ import numpy as np
 from typing import List, Dict, Tuple, Optional
 from habitat.utils.visualizations import maps
 
+from VLN_CE.habitat_extensions.maps import TopDownMapRenderer
+
 try:
     import imageio
     HAS_IMAGEIO = True
@@ -42,16 +44,22 @@ class ObservationCollector:
         "rgb_front_left"    # 左前方
     ]
     
-    def __init__(self, output_dir: str):
+    def __init__(self, output_dir: str, visualize: bool = True, verbose: bool = True):
         """
         初始化收集器
         
         Args:
             output_dir: 输出目录
+            visualize: 是否生成单步可视化和GIF（throughput模式下关闭）
+            verbose: 是否打印保存信息
         """
         self.output_dir = output_dir
+        self.visualize = visualize
+        self.verbose = verbose
         self.maps_dir = None
         self.video_frames = []
+        # 增量渲染俯视地图，每个episode重置
+        self.map_renderer = TopDownMapRenderer(colorize_fn=maps.colorize_topdown_map)
         os.makedirs(output_dir, exist_ok=True)
     
     def collect_8_directions(self, 
@@ -86,6 +94,7 @@ class ObservationCollector:
         self.maps_dir = os.path.join(episode_dir, "maps")
         os.makedirs(self.maps_dir, exist_ok=True)
         self.video_frames = []
+        self.map_renderer.reset()
     
     def save_step_visualization(self,
                                observations: Dict,
@@ -108,7 +117,7 @@ class ObservationCollector:
         Returns:
             保存的图像路径
         """
-        if not self.maps_dir or "rgb" not in observations:
+        if not self.visualize or not self.maps_dir or "rgb" not in observations:
             return None
         
         # 获取第一人称RGB
@@ -116,7 +125,7 @@ class ObservationCollector:
         
         # 获取地图
         if "top_down_map_vlnce" in info:
-            top_down_map = maps.colorize_draw_agent_and_fit_to_height(
+            top_down_map = self.map_renderer.render(
                 info["top_down_map_vlnce"], rgb.shape[0]
             )
         else:
@@ -224,12 +233,17 @@ class ObservationCollector:
         Returns:
             GIF路径
         """
+        if not self.visualize:
+            return None
+        
         if not self.video_frames:
-            print("⚠️  No frames to save")
+            if self.verbose:
+                print("⚠️  No frames to save")
             return None
         
         if not HAS_IMAGEIO:
-            print("⚠️  imageio not installed, cannot create GIF")
+            if self.verbose:
+                print("⚠️  imageio not installed, cannot create GIF")
             return None
         
         if output_path is None and self.maps_dir:
@@ -254,13 +268,16 @@ class ObservationCollector:
             imageio.mimsave(output_path, frames_rgb, duration=duration, loop=0)
             
             if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
-                print(f"✓ GIF saved: {output_path} ({len(self.video_frames)} frames, {fps} fps)")
+                if self.verbose:
+                    print(f"✓ GIF saved: {output_path} ({len(self.video_frames)} frames, {fps} fps)")
                 return output_path
             else:
-                print(f"✗ GIF file creation failed")
+                if self.verbose:
+                    print(f"✗ GIF file creation failed")
                 return None
                 
         except Exception as e:
-            print(f"✗ Error saving GIF: {e}")
+            if self.verbose:
+                print(f"✗ Error saving GIF: {e}")
             return None
 
@@ -1,3 +1,9 @@
-from VLN_CE.habitat_extensions import actions, measures, obs_transformers, sensors
+from VLN_CE.habitat_extensions import (
+    actions,
+    measures,
+    obs_transformers,
+    sensors,
+    simulator,
+)
 from VLN_CE.habitat_extensions.config.default import get_extended_config
 from VLN_CE.habitat_extensions.task import VLNCEDatasetV1
@@ -6,6 +6,12 @@ from habitat.config.default import get_config
 _C = get_config()
 _C.defrost()
 
+# ----------------------------------------------------------------------------
+# SIMULATOR
+# ----------------------------------------------------------------------------
+# set SIMULATOR.TYPE to "VLNCESim-v0" for HabitatSim with a per-episode
+# geodesic distance cache (see simulator.py)
+
 # ----------------------------------------------------------------------------
 # PANORAMA SETTINGS
 # ----------------------------------------------------------------------------
@@ -39,6 +45,12 @@ _C.TASK.SHORTEST_PATH_SENSOR.GOAL_RADIUS = 0.5
 # compatibility with the oracle used during dataset generation.
 # if False, use the current version of the Habitat-Lab ShortestPathFollower
 _C.TASK.SHORTEST_PATH_SENSOR.USE_ORIGINAL_FOLLOWER = False
+# the original follower predicts turns analytically instead of stepping the
+# simulator and restoring the agent state. Only applies to noiseless action
+# spaces. Only enable it after `python -m
+# VLN_CE.habitat_extensions.follower_parity` reports no disagreeing states on
+# recorded episodes of the task.
+_C.TASK.SHORTEST_PATH_SENSOR.PROBE_FREE = False
 # -----------------------------------------------------------------------------
 # VLN ORACLE PROGRESS SENSOR
 # ----------------------------------------------------------------------------
@@ -63,7 +75,11 @@ _C.TASK.ACTIONS.GO_TOWARD_POINT.rotate_agent = True
 _C.TASK.NDTW = CN()
 _C.TASK.NDTW.TYPE = "NDTW"
 _C.TASK.NDTW.SPLIT = "val_seen"
-_C.TASK.NDTW.FDTW = True  # False: DTW
+# True: fastdtw approximation (the published VLN-CE numbers), computed over
+# the full trajectory when the metric is read.
+# False: exact DTW, computed incrementally in O(len(gt_path)) per step. Exact
+# DTW values differ from fastdtw values.
+_C.TASK.NDTW.FDTW = True
 _C.TASK.NDTW.GT_PATH = (
     "data/datasets/R2R_VLNCE_v1-3_preprocessed/{split}/{split}_gt.json.gz"
 )
@@ -113,6 +129,14 @@ _C.TASK.TOP_DOWN_MAP_VLNCE.DRAW_REFERENCE_PATH = True
 _C.TASK.TOP_DOWN_MAP_VLNCE.DRAW_FIXED_WAYPOINTS = True
 _C.TASK.TOP_DOWN_MAP_VLNCE.DRAW_MP3D_AGENT_PATH = True
 _C.TASK.TOP_DOWN_MAP_VLNCE.GRAPHS_FILE = "VLN_CE/data/connectivity_graphs.pkl"
+# scene graphs kept in memory when GRAPHS_FILE has been split into a
+# per-scene store (see graph_store.py)
+_C.TASK.TOP_DOWN_MAP_VLNCE.GRAPHS_CACHE_SIZE = 4
+# base maps and MP3D node layers are cached per (scene, floor height,
+# resolution) in memory up to MAP_CACHE_SIZE_MB and, if MAP_CACHE_DIR is
+# set, on disk across runs
+_C.TASK.TOP_DOWN_MAP_VLNCE.MAP_CACHE_SIZE_MB = 256
+_C.TASK.TOP_DOWN_MAP_VLNCE.MAP_CACHE_DIR = ""
 _C.TASK.TOP_DOWN_MAP_VLNCE.FOG_OF_WAR = CN()
 _C.TASK.TOP_DOWN_MAP_VLNCE.FOG_OF_WAR.DRAW = True
 _C.TASK.TOP_DOWN_MAP_VLNCE.FOG_OF_WAR.FOV = 90
@@ -135,6 +159,12 @@ _C.DATASET.ROLES = ["guide"]  # options: "guide", "follower"
 _C.DATASET.LANGUAGES = ["*"]
 # a list of episode IDs to allow in dataset creation.
 _C.DATASET.EPISODES_ALLOWED = ["*"]
+# keep only shard SHARD_ID of NUM_SHARDS contiguous (scene, episode ID)
+# chunks. With an episode store (see episode_store.py) the other shards are
+# never decoded. construct_envs resolves the shard to EPISODES_ALLOWED once,
+# before splitting scenes between envs.
+_C.DATASET.NUM_SHARDS = 1
+_C.DATASET.SHARD_ID = 0
 
 
 def get_extended_config(
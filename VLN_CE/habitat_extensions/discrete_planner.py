@@ -1,3 +1,4 @@
+import os
 from typing import List, Tuple
 
 import numpy as np
@@ -109,3 +110,102 @@ class DiscretePathPlanner:
     @staticmethod
     def pol2cart_habitat(rho: float, phi: float) -> ndarray:
         return rho * np.array([-np.cos(phi), -np.sin(phi)])
+
+
+class LookupDiscretePathPlanner(DiscretePathPlanner):
+    """DiscretePathPlanner that serves plans for waypoints on a quantized
+    (r, theta) grid from a precomputed table. Queries off the grid fall
+    back to the exact greedy planner. The table depends only on the planner
+    and grid parameters and is cached on disk per configuration.
+    """
+
+    # a query within this distance of a grid point (meters or radians) is
+    # considered on the grid
+    GRID_TOLERANCE = 1e-5
+
+    def __init__(
+        self,
+        forward_distance: float = 0.25,
+        turn_angle: float = DiscretePathPlanner.RAD_15DEG,
+        goal_radius: float = 0.13,
+        step_limit: int = 200,
+        distance_resolution: float = 0.05,
+        max_distance: float = 3.0,
+        heading_resolution: float = np.deg2rad(5.0),
+        cache_dir: str = "",
+    ) -> None:
+        """
+        Args:
+            distance_resolution: grid step of r in meters
+            max_distance: largest r in the grid
+            heading_resolution: grid step of theta in radians
+            cache_dir: where tables are stored. Empty disables caching.
+        """
+        super().__init__(forward_distance, turn_angle, goal_radius, step_limit)
+        self.distance_resolution = distance_resolution
+        self.heading_resolution = heading_resolution
+        self.num_distances = int(round(max_distance / distance_resolution)) + 1
+        self.num_headings = int(round((np.pi * 2) / heading_resolution))
+        self._plans = self._load_or_build_table(cache_dir)
+
+    def plan(self, r: float, theta: float) -> List[int]:
+        r_idx = round(r / self.distance_resolution)
+        theta_idx = round(theta / self.heading_resolution)
+        if (
+            0 <= r_idx < self.num_distances
+            and 0 <= theta_idx < self.num_headings
+            and abs(r - self._grid_r(r_idx)) < self.GRID_TOLERANCE
+            and abs(theta - self._grid_theta(theta_idx)) < self.GRID_TOLERANCE
+        ):
+            return list(self._plans[r_idx * self.num_headings + theta_idx])
+        return super().plan(r, theta)
+
+    def _grid_r(self, r_idx: int) -> float:
+        return r_idx * self.distance_resolution
+
+    def _grid_theta(self, theta_idx: int) -> float:
+        return theta_idx * self.heading_resolution
+
+    def _table_name(self) -> str:
+        params = [
+            self._forward_distance,
+            self.turn_angle,
+            self.goal_radius,
+            self.step_limit,
+            self.distance_resolution,
+            self.num_distances,
+            self.heading_resolution,
+            self.num_headings,
+        ]
+        return "plans_" + "_".join(f"{p:.6g}" for p in params) + ".npz"
+
+    def _load_or_build_table(self, cache_dir: str) -> List[Tuple[int, ...]]:
+        table_path = os.path.join(cache_dir, self._table_name())
+        if cache_dir and os.path.exists(table_path):
+            with np.load(table_path) as table:
+                actions, offsets = table["actions"], table["offsets"]
+        else:
+            plans = [
+                super(LookupDiscretePathPlanner, self).plan(
+                    self._grid_r(r_idx), self._grid_theta(theta_idx)
+                )
+                for r_idx in range(self.num_distances)
+                for theta_idx in range(self.num_headings)
+            ]
+            offsets = np.zeros(len(plans) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(p) for p in plans])
+            actions = np.array(
+                [a for p in plans for a in p], dtype=np.int64
+            )
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+                # write then rename so concurrent envs never read partial files
+                tmp_path = f"{table_path}.{os.getpid()}.tmp.npz"
+                np.savez(tmp_path, actions=actions, offsets=offsets)
+                os.replace(tmp_path, table_path)
+
+        actions = actions.tolist()
+        return [
+            tuple(actions[offsets[i] : offsets[i + 1]])
+            for i in range(len(offsets) - 1)
+        ]
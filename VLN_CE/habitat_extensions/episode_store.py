@@ -0,0 +1,229 @@
+"""A compact episode store for the VLN-CE datasets.
+
+Loading a split from `{split}.json.gz` means decompressing and parsing every
+episode and building attrs objects for all of them, even when a worker only
+keeps one shard or one scene. `build_episode_store` packs a split file into
+a directory with the per-episode JSON records stored back to back and a few
+columns that allow selecting episodes without decoding them:
+
+    records.bin             utf-8 JSON of each episode, concatenated
+    record_offsets.npy      int64 [num_episodes + 1]
+    scene_idx.npy           int32 [num_episodes], index into meta["scenes"]
+    meta.json               episode IDs, languages, scene names and the
+                            instruction vocab
+
+`EpisodeStore` memory-maps the records and only decodes the rows selected by
+`select_rows`, so worker startup scales with its shard.
+
+Usage:
+    python -m VLN_CE.habitat_extensions.episode_store \
+        --data-path data/datasets/R2R_VLNCE_v1-3_preprocessed/{split}/{split}.json.gz \
+        --splits train val_seen val_unseen
+"""
+
+import argparse
+import gzip
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from numpy import ndarray
+
+STORE_SUFFIX = ".episodes"
+
+
+def store_dir_from_data_file(data_file: str) -> str:
+    """data/.../val_seen.json.gz -> data/.../val_seen.episodes"""
+    for ext in [".json.gz", ".json"]:
+        if data_file.endswith(ext):
+            return data_file[: -len(ext)] + STORE_SUFFIX
+    return data_file + STORE_SUFFIX
+
+
+def store_exists(store_dir: str) -> bool:
+    return all(
+        os.path.exists(os.path.join(store_dir, f))
+        for f in [
+            "records.bin",
+            "record_offsets.npy",
+            "scene_idx.npy",
+            "meta.json",
+        ]
+    )
+
+
+def scene_name(scene_id: str) -> str:
+    """/path/to/<scene_name>.<ext> -> <scene_name>"""
+    return os.path.splitext(os.path.basename(scene_id))[0]
+
+
+def shard_slice(
+    num_items: int, num_shards: int = 1, shard_id: int = 0
+) -> slice:
+    """The contiguous chunk of `num_items` items, sorted by (scene, episode
+    ID), that belongs to shard `shard_id`. Chunk sizes differ by at most one
+    and contiguous chunks keep the episodes of a scene together so a worker
+    loads few scenes.
+    """
+    assert 0 <= shard_id < num_shards, "SHARD_ID must be in [0, NUM_SHARDS)"
+    size, extra = divmod(num_items, num_shards)
+    start = shard_id * size + min(shard_id, extra)
+    return slice(start, start + size + (shard_id < extra))
+
+
+def build_episode_store(
+    data_file: str, store_dir: Optional[str] = None
+) -> str:
+    """Packs a dataset json(.gz) split file into an episode store.
+    Returns:
+        the store directory
+    """
+    if store_dir is None:
+        store_dir = store_dir_from_data_file(data_file)
+
+    open_fn = gzip.open if data_file.endswith(".gz") else open
+    with open_fn(data_file, "rt") as f:
+        deserialized = json.load(f)
+
+    episodes = deserialized["episodes"]
+    scenes: List[str] = []
+    scene_to_idx: Dict[str, int] = {}
+    scene_idx = np.zeros(len(episodes), dtype=np.int32)
+    record_offsets = np.zeros(len(episodes) + 1, dtype=np.int64)
+
+    os.makedirs(store_dir, exist_ok=True)
+    with open(os.path.join(store_dir, "records.bin"), "wb") as f:
+        for i, episode in enumerate(episodes):
+            scene = scene_name(episode["scene_id"])
+            if scene not in scene_to_idx:
+                scene_to_idx[scene] = len(scenes)
+                scenes.append(scene)
+            scene_idx[i] = scene_to_idx[scene]
+
+            record = json.dumps(episode, separators=(",", ":")).encode()
+            f.write(record)
+            record_offsets[i + 1] = record_offsets[i] + len(record)
+
+    np.save(os.path.join(store_dir, "record_offsets.npy"), record_offsets)
+    np.save(os.path.join(store_dir, "scene_idx.npy"), scene_idx)
+
+    meta = {
+        "episode_ids": [str(ep["episode_id"]) for ep in episodes],
+        "languages": [
+            ep.get("instruction", {}).get("language") for ep in episodes
+        ],
+        "scenes": scenes,
+        "instruction_vocab": deserialized.get("instruction_vocab"),
+    }
+    # written last: its presence marks a complete store
+    with open(os.path.join(store_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    return store_dir
+
+
+class EpisodeStore:
+    """Read-only access to the raw episode records of one split file.
+    Selection works on the columns in meta.json; records are only decoded
+    by `record`.
+    """
+
+    def __init__(self, store_dir: str) -> None:
+        self.store_dir = store_dir
+        self._records = np.memmap(
+            os.path.join(store_dir, "records.bin"), dtype=np.uint8, mode="r"
+        )
+        self._offsets = np.load(
+            os.path.join(store_dir, "record_offsets.npy"), mmap_mode="r"
+        )
+        self._scene_idx = np.load(
+            os.path.join(store_dir, "scene_idx.npy"), mmap_mode="r"
+        )
+        with open(os.path.join(store_dir, "meta.json")) as f:
+            meta = json.load(f)
+
+        self.episode_ids: List[str] = meta["episode_ids"]
+        self.languages: List[Optional[str]] = meta["languages"]
+        self.scenes: List[str] = meta["scenes"]
+        self.instruction_vocab: Optional[Dict[str, Any]] = meta[
+            "instruction_vocab"
+        ]
+        self._rows = {ep_id: row for row, ep_id in enumerate(self.episode_ids)}
+
+    def __len__(self) -> int:
+        return len(self.episode_ids)
+
+    def __contains__(self, episode_id: str) -> bool:
+        return episode_id in self._rows
+
+    def row(self, episode_id: str) -> int:
+        return self._rows[episode_id]
+
+    def scene(self, row: int) -> str:
+        return self.scenes[self._scene_idx[row]]
+
+    def select_rows(
+        self,
+        scenes: Optional[Iterable[str]] = None,
+        episode_ids: Optional[Iterable[str]] = None,
+        languages: Optional[Iterable[str]] = None,
+    ) -> ndarray:
+        """Rows that pass all given filters (None means no filter), in file
+        order.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if scenes is not None:
+            scenes = set(scenes)
+            scene_mask = np.array([s in scenes for s in self.scenes])
+            mask &= scene_mask[np.asarray(self._scene_idx)]
+        if episode_ids is not None:
+            rows = [self._rows[e] for e in set(episode_ids) if e in self._rows]
+            id_mask = np.zeros(len(self), dtype=bool)
+            id_mask[rows] = True
+            mask &= id_mask
+        if languages is not None:
+            languages = set(languages)
+            mask &= np.array([lang in languages for lang in self.languages])
+
+        return np.nonzero(mask)[0].astype(np.int64)
+
+    def record(self, row: int) -> Dict[str, Any]:
+        """Decodes the raw episode dictionary stored at `row`."""
+        start, end = self._offsets[row], self._offsets[row + 1]
+        return json.loads(self._records[start:end].tobytes())
+
+
+def load_episode_store(data_file: str) -> Optional[EpisodeStore]:
+    """Returns the store built for `data_file` or None if it has not been
+    converted with `build_episode_store`.
+    """
+    store_dir = store_dir_from_data_file(data_file)
+    if not store_exists(store_dir):
+        return None
+    return EpisodeStore(store_dir)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Convert dataset split files into episode stores."
+    )
+    parser.add_argument(
+        "--data-path",
+        type=str,
+        required=True,
+        help="split file template, may contain {split} and {role}",
+    )
+    parser.add_argument("--splits", type=str, nargs="+", required=True)
+    parser.add_argument("--roles", type=str, nargs="*", default=["guide"])
+    args = parser.parse_args()
+
+    roles = args.roles if "{role}" in args.data_path else [None]
+    for split in args.splits:
+        for role in roles:
+            data_file = args.data_path.format(split=split, role=role)
+            print(f"{data_file} -> {build_episode_store(data_file)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""A memory-mapped store of RxR BERT instruction features.
+
+The baseline RxR text features come as one `.npz` file per instruction and
+language. `build_feature_store` packs all files of a split into one
+directory:
+
+    features.npy            float32 [total_tokens, 768], unpadded rows of
+                            every instruction stored back to back
+    offsets.npy             int64   [num_instructions + 1]
+    keys.json               "{id}_{lang}" of each instruction in row order
+
+`FeatureStore` memory-maps the features read-only so all env processes on a
+node share the same pages instead of each reading the .npz files.
+
+Usage:
+    python -m VLN_CE.habitat_extensions.feature_store \
+        --features-path data/datasets/RxR_VLNCE_v0/text_features/rxr_{split}/{id:06}_{lang}_text_features.npz \
+        --splits train val_seen val_unseen
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import string
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+from numpy import ndarray
+
+STORE_NAME = "rxr_{split}_text_features"
+
+# one store per directory per process
+_store_cache: Dict[str, "FeatureStore"] = {}
+
+
+def feature_key(instruction_id: int, lang: str) -> str:
+    return f"{int(instruction_id)}_{lang}"
+
+
+def store_dir_from_features_path(features_path: str, split: str) -> str:
+    """.../text_features/rxr_{split}/{id:06}_{lang}_text_features.npz
+    -> .../text_features/rxr_{split}_text_features
+    """
+    features_dir = os.path.dirname(features_path)
+    while "{" in features_dir:
+        features_dir = os.path.dirname(features_dir)
+    return os.path.join(features_dir, STORE_NAME.format(split=split))
+
+
+def store_exists(store_dir: str) -> bool:
+    return all(
+        os.path.exists(os.path.join(store_dir, f))
+        for f in ["features.npy", "offsets.npy", "keys.json"]
+    )
+
+
+def _iter_feature_files(
+    features_path: str, split: str
+) -> Iterator[Tuple[str, str]]:
+    """Yields (key, file) for every feature file of `split` by turning the
+    {id} and {lang} fields of the path template into a glob and a regex.
+    """
+    glob_parts, regex_parts = [], []
+    for literal, field, _, _ in string.Formatter().parse(features_path):
+        glob_parts.append(glob.escape(literal))
+        regex_parts.append(re.escape(literal))
+        if field is None:
+            continue
+        if field == "split":
+            glob_parts.append(split)
+            regex_parts.append(re.escape(split))
+        else:
+            glob_parts.append("*")
+            regex_parts.append(f"(?P<{field}>[^/]+?)")
+
+    pattern = re.compile("".join(regex_parts) + "$")
+    for file in sorted(glob.glob("".join(glob_parts))):
+        match = pattern.match(file)
+        if match is not None:
+            yield feature_key(match["id"], match["lang"]), file
+
+
+def build_feature_store(
+    features_path: str, split: str, store_dir: Optional[str] = None
+) -> str:
+    """Packs the per-instruction feature files of a split into a store.
+    Returns:
+        the store directory
+    """
+    if store_dir is None:
+        store_dir = store_dir_from_features_path(features_path, split)
+
+    files = list(_iter_feature_files(features_path, split))
+    shapes = []
+    for _, file in files:
+        with np.load(file) as f:
+            shapes.append(f["features"].shape)
+
+    offsets = np.zeros(len(files) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([s[0] for s in shapes])
+    dim = shapes[0][1] if shapes else 768
+
+    os.makedirs(store_dir, exist_ok=True)
+    features = np.lib.format.open_memmap(
+        os.path.join(store_dir, "features.npy"),
+        mode="w+",
+        dtype=np.float32,
+        shape=(int(offsets[-1]), dim),
+    )
+    for i, (_, file) in enumerate(files):
+        with np.load(file) as f:
+            features[offsets[i] : offsets[i + 1]] = f["features"]
+    features.flush()
+    del features
+    np.save(os.path.join(store_dir, "offsets.npy"), offsets)
+
+    # written last: its presence marks a complete store
+    with open(os.path.join(store_dir, "keys.json"), "w") as f:
+        json.dump([k for k, _ in files], f)
+
+    return store_dir
+
+
+class FeatureStore:
+    """Read-only lookup of unpadded instruction features by key. Returned
+    arrays are views into a memory-mapped file and must not be modified.
+    """
+
+    def __init__(self, store_dir: str) -> None:
+        self.features = np.load(
+            os.path.join(store_dir, "features.npy"), mmap_mode="r"
+        )
+        self.offsets = np.load(
+            os.path.join(store_dir, "offsets.npy"), mmap_mode="r"
+        )
+        with open(os.path.join(store_dir, "keys.json")) as f:
+            self._rows = {k: row for row, k in enumerate(json.load(f))}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def __getitem__(self, key: str) -> ndarray:
+        """Returns: float32 [num_tokens, 768]"""
+        row = self._rows[key]
+        return self.features[self.offsets[row] : self.offsets[row + 1]]
+
+
+def load_feature_store(
+    features_path: str, split: str
+) -> Optional[FeatureStore]:
+    """Returns a process-wide shared store for the split or None if it has
+    not been built with `build_feature_store`.
+    """
+    store_dir = store_dir_from_features_path(features_path, split)
+    if not store_exists(store_dir):
+        return None
+
+    if store_dir not in _store_cache:
+        _store_cache[store_dir] = FeatureStore(store_dir)
+    return _store_cache[store_dir]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Pack RxR text feature files into memory-mapped stores."
+    )
+    parser.add_argument(
+        "--features-path",
+        type=str,
+        required=True,
+        help="feature file template with {split}, {id} and {lang}",
+    )
+    parser.add_argument("--splits", type=str, nargs="+", required=True)
+    args = parser.parse_args()
+
+    for split in args.splits:
+        store_dir = build_feature_store(args.features_path, split)
+        print(f"{split} -> {store_dir}")
+
+
+if __name__ == "__main__":
+    main()
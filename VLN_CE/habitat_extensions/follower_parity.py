@@ -0,0 +1,148 @@
+"""Checks the probe-free mode of ShortestPathFollowerCompat against the
+probing follower on recorded episodes.
+
+TASK.SHORTEST_PATH_SENSOR.PROBE_FREE may only be enabled once both modes
+choose the same action in every state the oracle visits. The check replays
+the recorded GT actions of each episode (TASK.NDTW.GT_PATH) and, before
+every action, asks both modes for their next action from the same agent
+state (see `ShortestPathFollowerCompat.probe_free_parity`).
+
+Usage:
+    python -m VLN_CE.habitat_extensions.follower_parity \
+        --task-config VLN_CE/habitat_extensions/config/vlnce_task.yaml \
+        --num-episodes 100
+
+Exits with status 1 if any state disagrees.
+"""
+
+import argparse
+import gzip
+import json
+import sys
+from typing import Any, Dict, List, Sequence
+
+from habitat import Env
+from habitat.config import Config
+
+from VLN_CE.habitat_extensions.config.default import get_extended_config
+from VLN_CE.habitat_extensions.gt_index import load_gt_path_index
+from VLN_CE.habitat_extensions.shortest_path_follower import (
+    NOISELESS_ACTION_SPACES,
+    ShortestPathFollowerCompat,
+)
+from VLN_CE.habitat_extensions.task import RxRVLNCEDatasetV1
+
+
+def _gt_files(config: Config) -> List[str]:
+    gt_path = config.TASK.NDTW.GT_PATH
+    split = config.DATASET.SPLIT
+    if "{role}" in gt_path:
+        return [
+            gt_path.format(split=split, role=role)
+            for role in RxRVLNCEDatasetV1.annotation_roles
+        ]
+    return [gt_path.format(split=split)]
+
+
+def _recorded_actions(gt_files: List[str]) -> Dict[str, Sequence[int]]:
+    gt_index = load_gt_path_index(gt_files)
+    if gt_index is not None:
+        return {
+            ep_id: gt_index.actions(ep_id) for ep_id in gt_index.episode_ids()
+        }
+
+    actions = {}
+    for gt_file in gt_files:
+        with gzip.open(gt_file, "rt") as f:
+            actions.update(
+                {k: v["actions"] for k, v in json.load(f).items()}
+            )
+    return actions
+
+
+def check_probe_free_parity(
+    config: Config, num_episodes: int = -1
+) -> Dict[str, Any]:
+    """Replays the recorded actions of the episodes of `config` and compares
+    the probe-free and the probing follower in every visited state.
+    Returns:
+        the number of replayed episodes and checked states, and the number
+        of disagreeing states of each episode that had any
+    """
+    assert (
+        config.SIMULATOR.ACTION_SPACE_CONFIG in NOISELESS_ACTION_SPACES
+    ), "PROBE_FREE only applies to noiseless action spaces."
+    recorded = _recorded_actions(_gt_files(config))
+
+    config = config.clone()
+    config.defrost()
+    config.TASK.MEASUREMENTS = []
+    config.TASK.SENSORS = []
+    config.freeze()
+
+    env = Env(config)
+    follower = ShortestPathFollowerCompat(
+        env.sim,
+        config.TASK.SHORTEST_PATH_SENSOR.GOAL_RADIUS,
+        return_one_hot=False,
+    )
+    if num_episodes < 0:
+        num_episodes = len(env.episodes)
+    num_episodes = min(num_episodes, len(env.episodes))
+
+    num_replayed = 0
+    num_states = 0
+    mismatches: Dict[str, int] = {}
+    for _ in range(num_episodes):
+        env.reset()
+        episode_id = str(env.current_episode.episode_id)
+        if episode_id not in recorded:
+            continue
+
+        num_replayed += 1
+        goal = env.current_episode.goals[0].position
+        for action in recorded[episode_id]:
+            if env.episode_over:
+                break
+            num_states += 1
+            if not follower.probe_free_parity(goal):
+                mismatches[episode_id] = mismatches.get(episode_id, 0) + 1
+            env.step(int(action))
+
+    env.close()
+    return {
+        "num_episodes": num_replayed,
+        "num_states": num_states,
+        "mismatches": mismatches,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare the probe-free and the probing shortest path "
+        "follower on recorded episodes."
+    )
+    parser.add_argument("--task-config", type=str, required=True)
+    parser.add_argument("--num-episodes", type=int, default=-1)
+    parser.add_argument(
+        "opts",
+        default=None,
+        nargs=argparse.REMAINDER,
+        help="Modify task config options from command line",
+    )
+    args = parser.parse_args()
+
+    config = get_extended_config(args.task_config, args.opts)
+    stats = check_probe_free_parity(config, args.num_episodes)
+    num_mismatches = sum(stats["mismatches"].values())
+    print(
+        f"{stats['num_states']} states of {stats['num_episodes']} episodes, "
+        f"{num_mismatches} disagreeing"
+    )
+    for episode_id, count in stats["mismatches"].items():
+        print(f"  episode {episode_id}: {count}")
+    sys.exit(1 if num_mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
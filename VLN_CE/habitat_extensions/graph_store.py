@@ -0,0 +1,121 @@
+"""A per-scene store of MP3D connectivity graphs.
+
+`GRAPHS_FILE` is a single pickle holding the nav-graph of every scene, so
+each env process loading it pays for all scenes. `build_graph_store` splits
+it into a directory with one pickle per scene:
+
+    connectivity_graphs.pkl -> connectivity_graphs/<scene>.pkl
+
+`SceneGraphStore` loads a scene's graph on first access and keeps the most
+recently used ones in memory.
+
+Usage:
+    python -m VLN_CE.habitat_extensions.graph_store \
+        --graphs-file VLN_CE/data/connectivity_graphs.pkl
+"""
+
+import argparse
+import os
+import pickle
+from collections import OrderedDict
+from typing import Dict, Optional, Union
+
+import networkx as nx
+
+DONE_MARKER = ".complete"
+
+
+def store_dir_from_graphs_file(graphs_file: str) -> str:
+    """data/connectivity_graphs.pkl -> data/connectivity_graphs"""
+    return os.path.splitext(graphs_file)[0]
+
+
+def store_exists(store_dir: str) -> bool:
+    return os.path.exists(os.path.join(store_dir, DONE_MARKER))
+
+
+def build_graph_store(
+    graphs_file: str, store_dir: Optional[str] = None
+) -> str:
+    """Splits a pickled {scene: graph} dictionary into per-scene pickles.
+    Returns:
+        the store directory
+    """
+    if store_dir is None:
+        store_dir = store_dir_from_graphs_file(graphs_file)
+
+    with open(graphs_file, "rb") as f:
+        graphs = pickle.load(f)
+
+    os.makedirs(store_dir, exist_ok=True)
+    for scene, graph in graphs.items():
+        with open(os.path.join(store_dir, f"{scene}.pkl"), "wb") as f:
+            pickle.dump(graph, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    # written last: its presence marks a complete store
+    open(os.path.join(store_dir, DONE_MARKER), "w").close()
+    return store_dir
+
+
+class SceneGraphStore:
+    """Maps scene names to nav-graphs, loading each graph on first access
+    and keeping at most `cache_size` graphs in memory.
+    """
+
+    def __init__(self, store_dir: str, cache_size: int = 4) -> None:
+        assert cache_size > 0, "the graph cache must hold at least one scene"
+        self.store_dir = store_dir
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, nx.Graph]" = OrderedDict()
+
+    def __contains__(self, scene: str) -> bool:
+        return scene in self._cache or os.path.exists(self._path(scene))
+
+    def __getitem__(self, scene: str) -> nx.Graph:
+        if scene in self._cache:
+            self._cache.move_to_end(scene)
+            return self._cache[scene]
+
+        if not os.path.exists(self._path(scene)):
+            raise KeyError(scene)
+        with open(self._path(scene), "rb") as f:
+            graph = pickle.load(f)
+
+        self._cache[scene] = graph
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return graph
+
+    def _path(self, scene: str) -> str:
+        return os.path.join(self.store_dir, f"{scene}.pkl")
+
+
+def load_scene_graphs(
+    graphs_file: str, cache_size: int = 4
+) -> Union[SceneGraphStore, Dict[str, nx.Graph]]:
+    """Returns a lazy per-scene store if `graphs_file` has been converted
+    with `build_graph_store`, otherwise the fully unpickled dictionary.
+    """
+    store_dir = store_dir_from_graphs_file(graphs_file)
+    if store_exists(store_dir):
+        return SceneGraphStore(store_dir, cache_size)
+
+    with open(graphs_file, "rb") as f:
+        return pickle.load(f)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Split a connectivity graph pickle into per-scene files."
+    )
+    parser.add_argument(
+        "--graphs-file",
+        type=str,
+        default="VLN_CE/data/connectivity_graphs.pkl",
+    )
+    args = parser.parse_args()
+    print(f"{args.graphs_file} -> {build_graph_store(args.graphs_file)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""A compact, memory-mapped index of ground-truth paths.
+
+The GT files (`{split}_gt.json.gz`) map episode IDs to dictionaries with
+"locations" and "actions". Parsing them costs seconds and a private copy of
+the data in every process that needs it. `build_gt_path_index` packs a GT
+file into a directory of columnar .npy arrays:
+
+    locations.npy           float64 [total_locations, 3]
+    location_offsets.npy    int64   [num_episodes + 1]
+    actions.npy             int32   [total_actions]
+    action_offsets.npy      int64   [num_episodes + 1]
+    episode_ids.json        episode IDs in row order
+
+`GTPathIndex` memory-maps these arrays read-only so all env processes on a
+node share the same pages. Locations keep the float64 precision of the JSON
+so that measures compare against exactly the same reference paths.
+
+Usage:
+    python -m VLN_CE.habitat_extensions.gt_index \
+        --gt-path data/datasets/RxR_VLNCE_v0/{split}/{split}_{role}_gt.json.gz \
+        --splits train val_seen val_unseen --roles guide follower
+"""
+
+import argparse
+import gzip
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from numpy import ndarray
+
+INDEX_SUFFIX = ".index"
+_ARRAYS = ["locations", "location_offsets", "actions", "action_offsets"]
+
+# one index per set of GT files per process
+_index_cache: Dict[Tuple[str, ...], "GTPathIndex"] = {}
+
+
+def index_dir_from_gt_file(gt_file: str) -> str:
+    """data/.../val_seen_gt.json.gz -> data/.../val_seen_gt.index"""
+    for ext in [".json.gz", ".json"]:
+        if gt_file.endswith(ext):
+            return gt_file[: -len(ext)] + INDEX_SUFFIX
+    return gt_file + INDEX_SUFFIX
+
+
+def index_exists(index_dir: str) -> bool:
+    if not (
+        os.path.exists(os.path.join(index_dir, "episode_ids.json"))
+        and all(
+            os.path.exists(os.path.join(index_dir, f"{k}.npy"))
+            for k in _ARRAYS
+        )
+    ):
+        return False
+
+    # indices built with float32 locations must be rebuilt
+    locations = np.load(
+        os.path.join(index_dir, "locations.npy"), mmap_mode="r"
+    )
+    return locations.dtype == np.float64
+
+
+def build_gt_path_index(gt_file: str, index_dir: Optional[str] = None) -> str:
+    """Packs a GT json(.gz) file into a columnar index directory.
+    Returns:
+        the index directory
+    """
+    if index_dir is None:
+        index_dir = index_dir_from_gt_file(gt_file)
+
+    open_fn = gzip.open if gt_file.endswith(".gz") else open
+    with open_fn(gt_file, "rt") as f:
+        gt_data = json.load(f)
+
+    episode_ids = list(gt_data.keys())
+    location_offsets = np.zeros(len(episode_ids) + 1, dtype=np.int64)
+    action_offsets = np.zeros(len(episode_ids) + 1, dtype=np.int64)
+    for i, ep_id in enumerate(episode_ids):
+        location_offsets[i + 1] = location_offsets[i] + len(
+            gt_data[ep_id]["locations"]
+        )
+        action_offsets[i + 1] = action_offsets[i] + len(
+            gt_data[ep_id].get("actions", [])
+        )
+
+    locations = np.zeros((location_offsets[-1], 3), dtype=np.float64)
+    actions = np.zeros(action_offsets[-1], dtype=np.int32)
+    for i, ep_id in enumerate(episode_ids):
+        if location_offsets[i + 1] > location_offsets[i]:
+            locations[location_offsets[i] : location_offsets[i + 1]] = gt_data[
+                ep_id
+            ]["locations"]
+        if action_offsets[i + 1] > action_offsets[i]:
+            actions[action_offsets[i] : action_offsets[i + 1]] = gt_data[
+                ep_id
+            ]["actions"]
+
+    os.makedirs(index_dir, exist_ok=True)
+    np.save(os.path.join(index_dir, "locations.npy"), locations)
+    np.save(os.path.join(index_dir, "location_offsets.npy"), location_offsets)
+    np.save(os.path.join(index_dir, "actions.npy"), actions)
+    np.save(os.path.join(index_dir, "action_offsets.npy"), action_offsets)
+
+    # written last: its presence marks a complete index
+    with open(os.path.join(index_dir, "episode_ids.json"), "w") as f:
+        json.dump(episode_ids, f)
+
+    return index_dir
+
+
+class GTPathIndex:
+    """Read-only lookup of GT locations and actions by episode ID over one or
+    more index directories (e.g. one per RxR annotation role). Returned
+    arrays are views into memory-mapped files and must not be modified.
+    """
+
+    def __init__(self, index_dirs: List[str]) -> None:
+        self._parts = []
+        self._rows: Dict[str, Tuple[int, int]] = {}
+
+        for part_idx, index_dir in enumerate(index_dirs):
+            part = {
+                k: np.load(os.path.join(index_dir, f"{k}.npy"), mmap_mode="r")
+                for k in _ARRAYS
+            }
+            self._parts.append(part)
+
+            with open(os.path.join(index_dir, "episode_ids.json")) as f:
+                for row, ep_id in enumerate(json.load(f)):
+                    self._rows[ep_id] = (part_idx, row)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, episode_id: str) -> bool:
+        return episode_id in self._rows
+
+    def episode_ids(self) -> Iterator[str]:
+        return iter(self._rows)
+
+    def locations(self, episode_id: str) -> ndarray:
+        """Returns: float64 [num_locations, 3]"""
+        part_idx, row = self._rows[episode_id]
+        part = self._parts[part_idx]
+        offsets = part["location_offsets"]
+        return part["locations"][offsets[row] : offsets[row + 1]]
+
+    def actions(self, episode_id: str) -> ndarray:
+        """Returns: int32 [num_actions]"""
+        part_idx, row = self._rows[episode_id]
+        part = self._parts[part_idx]
+        offsets = part["action_offsets"]
+        return part["actions"][offsets[row] : offsets[row + 1]]
+
+
+def load_gt_path_index(gt_files: List[str]) -> Optional[GTPathIndex]:
+    """Returns a process-wide shared index for the given GT files or None if
+    any of them has not been converted with `build_gt_path_index`.
+    """
+    index_dirs = tuple(index_dir_from_gt_file(f) for f in gt_files)
+    if not all(index_exists(d) for d in index_dirs):
+        return None
+
+    if index_dirs not in _index_cache:
+        _index_cache[index_dirs] = GTPathIndex(list(index_dirs))
+    return _index_cache[index_dirs]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Convert GT path files into memory-mapped indices."
+    )
+    parser.add_argument(
+        "--gt-path",
+        type=str,
+        required=True,
+        help="GT file template, may contain {split} and {role}",
+    )
+    parser.add_argument("--splits", type=str, nargs="+", required=True)
+    parser.add_argument("--roles", type=str, nargs="*", default=["guide"])
+    args = parser.parse_args()
+
+    roles = args.roles if "{role}" in args.gt_path else [None]
+    for split in args.splits:
+        for role in roles:
+            gt_file = args.gt_path.format(split=split, role=role)
+            print(f"{gt_file} -> {build_gt_path_index(gt_file)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""A bounded cache of static top-down map layers.
+
+Rasterizing the navmesh and drawing the MP3D nodes only depend on the
+scene, the floor and the map settings, so consecutive episodes on the same
+floor can share them. `TopDownMapCache` is an LRU keyed by tuples such as
+(scene, floor height, resolution, ...) and bounded by the total size of the
+cached maps. With a `cache_dir` maps are also persisted as .npy files and
+reused across runs.
+"""
+
+import os
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+import numpy as np
+from numpy import ndarray
+
+
+class TopDownMapCache:
+    def __init__(self, max_size_mb: float, cache_dir: str = "") -> None:
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.cache_dir = cache_dir
+        self._maps: "OrderedDict[Tuple[Hashable, ...], ndarray]" = (
+            OrderedDict()
+        )
+        self._num_bytes = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[ndarray]:
+        """Returns the cached map (do not modify it) or None."""
+        if key in self._maps:
+            self._maps.move_to_end(key)
+            return self._maps[key]
+
+        if self.cache_dir and os.path.exists(self._path(key)):
+            top_down_map = np.load(self._path(key))
+            self._insert(key, top_down_map)
+            return top_down_map
+        return None
+
+    def put(self, key: Tuple[Hashable, ...], top_down_map: ndarray) -> None:
+        top_down_map = top_down_map.copy()
+        top_down_map.flags.writeable = False
+        self._insert(key, top_down_map)
+
+        if self.cache_dir and not os.path.exists(self._path(key)):
+            # write then rename so concurrent envs never read partial files
+            tmp_path = f"{self._path(key)}.{os.getpid()}.tmp.npy"
+            np.save(tmp_path, top_down_map)
+            os.replace(tmp_path, self._path(key))
+
+    def _insert(self, key: Tuple[Hashable, ...], top_down_map: ndarray):
+        if key in self._maps:
+            self._num_bytes -= self._maps.pop(key).nbytes
+        self._maps[key] = top_down_map
+        self._num_bytes += top_down_map.nbytes
+        # always keep the newest map, even if it alone exceeds the budget
+        while self._num_bytes > self.max_bytes and len(self._maps) > 1:
+            self._num_bytes -= self._maps.popitem(last=False)[1].nbytes
+
+    def _path(self, key: Tuple[Hashable, ...]) -> str:
+        name = "_".join(
+            f"{k:.2f}" if isinstance(k, float) else str(k) for k in key
+        )
+        return os.path.join(self.cache_dir, f"{name}.npy")
@@ -1,4 +1,5 @@
-from typing import Dict, List, Optional, Tuple, Union
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import networkx as nx
 import numpy as np
@@ -274,24 +275,85 @@ def draw_oracle_waypoint(
     draw_triangle(img, (w_x, w_y), MAP_ORACLE_WAYPOINT, meters_per_px, pad=0.2)
 
 
-def get_nearest_node(graph: nx.Graph, current_position: List[float]) -> str:
+class NavGraphIndex:
+    """Node positions of an MP3D nav-graph packed into arrays so nearest-node
+    queries and floor selection are vectorized instead of looping over the
+    graph in Python. Nodes are kept sorted by height so the nodes of a floor
+    are found with a binary search. Built once per graph by
+    `get_nav_graph_index`; the graph is assumed not to change afterwards.
+    """
+
+    def __init__(self, graph: nx.Graph) -> None:
+        nodes = list(graph)
+        positions = np.array(
+            [graph.nodes[n]["position"] for n in nodes], dtype=np.float64
+        ).reshape(-1, 3)
+        self.nodes = nodes
+        self.positions = positions
+        self.xz = positions[:, [0, 2]]
+
+        row = {n: i for i, n in enumerate(nodes)}
+        self.candidates = {
+            n: np.array(
+                [row[n]] + [row[e[1]] for e in graph.edges(n)], dtype=np.int64
+            )
+            for n in nodes
+        }
+
+        self._height_order = np.argsort(positions[:, 1], kind="stable")
+        self._sorted_heights = positions[self._height_order, 1]
+
+    def _nearest_of(self, rows: np.ndarray, position: np.ndarray) -> str:
+        # argmin keeps the first of equally near nodes, like a Python loop
+        diff = self.xz[rows] - position
+        return self.nodes[rows[np.argmin(np.einsum("ij,ij->i", diff, diff))]]
+
+    def nearest_node(self, position: List[float]) -> Optional[str]:
+        if not self.nodes:
+            return None
+        return self._nearest_of(
+            np.arange(len(self.nodes)), np.asarray(position, dtype=np.float64)
+        )
+
+    def nearest_neighbor(self, node: str, position: np.ndarray) -> str:
+        return self._nearest_of(
+            self.candidates[node], np.asarray(position, dtype=np.float64)
+        )
+
+    def rows_near_height(self, height: float, tolerance: float) -> np.ndarray:
+        """Rows of nodes with |node height - height| < tolerance, in graph
+        order.
+        """
+        lo = np.searchsorted(
+            self._sorted_heights, height - tolerance, side="right"
+        )
+        hi = np.searchsorted(
+            self._sorted_heights, height + tolerance, side="left"
+        )
+        return np.sort(self._height_order[lo:hi])
+
+
+_nav_graph_indices: "weakref.WeakKeyDictionary[nx.Graph, NavGraphIndex]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_nav_graph_index(graph: nx.Graph) -> NavGraphIndex:
+    """Returns the cached index of `graph`, building it on first use."""
+    if graph not in _nav_graph_indices:
+        _nav_graph_indices[graph] = NavGraphIndex(graph)
+    return _nav_graph_indices[graph]
+
+
+def get_nearest_node(
+    graph: nx.Graph, current_position: List[float]
+) -> Optional[str]:
     """Determine the closest MP3D node to the agent's start position as given
     by a [x,z] position vector.
     Returns:
-        node ID
+        node ID, or None if the graph has no nodes
     """
-    nearest = None
-    dist = float("inf")
-    for node in graph:
-        node_pos = graph.nodes[node]["position"]
-        node_pos = np.take(node_pos, (0, 2))
-        cur_dist = np.linalg.norm(
-            np.array(node_pos) - np.array(current_position), ord=2
-        )
-        if cur_dist < dist:
-            dist = cur_dist
-            nearest = node
-    return nearest
+    return get_nav_graph_index(graph).nearest_node(current_position)
 
 
 def update_nearest_node(
@@ -303,19 +365,9 @@ def update_nearest_node(
     Returns:
         node ID
     """
-    nearest = None
-    dist = float("inf")
-
-    for node in [nearest_node] + [e[1] for e in graph.edges(nearest_node)]:
-        node_pos = graph.nodes[node]["position"]
-        node_pos = np.take(node_pos, (0, 2))
-        cur_dist = np.linalg.norm(
-            np.array(node_pos) - np.array(current_position), ord=2
-        )
-        if cur_dist < dist:
-            dist = cur_dist
-            nearest = node
-    return nearest
+    return get_nav_graph_index(graph).nearest_neighbor(
+        nearest_node, current_position
+    )
 
 
 def draw_mp3d_nodes(
@@ -325,19 +377,183 @@ def draw_mp3d_nodes(
     graph: nx.Graph,
     meters_per_px: float,
 ) -> None:
-    n = get_nearest_node(
-        graph, (episode.start_position[0], episode.start_position[2])
+    index = get_nav_graph_index(graph)
+    n = index.nearest_node(
+        (episode.start_position[0], episode.start_position[2])
     )
     starting_height = graph.nodes[n]["position"][1]
-    for node in graph:
-        pos = graph.nodes[node]["position"]
 
-        # no obvious way to differentiate between floors. Use this for now.
-        if abs(pos[1] - starting_height) < 1.0:
-            r_x, r_y = habitat_maps.to_grid(
-                pos[2], pos[0], img.shape[0:2], sim
+    # no obvious way to differentiate between floors. Use this for now.
+    for pos in index.positions[index.rows_near_height(starting_height, 1.0)]:
+        r_x, r_y = habitat_maps.to_grid(pos[2], pos[0], img.shape[0:2], sim)
+
+        # only paint if over a valid point
+        if img[r_x, r_y]:
+            drawpoint(img, (r_x, r_y), MAP_MP3D_WAYPOINT, meters_per_px)
+
+
+class TopDownMapRenderer:
+    """Stateful version of Habitat-Lab's
+    `maps.colorize_draw_agent_and_fit_to_height` for per-step
+    visualization. It keeps the colorized map and the fitted (rotated and
+    resized) map between frames. When the map info comes from consecutive
+    steps of `TopDownMapVLNCE`, only the cells in its "dirty_region" are
+    recolored and only the output pixels that sample them are resampled;
+    the agent sprite is drawn on a copy of the fitted map. Any other input
+    (a new episode, a skipped step, a map without dirty regions) triggers a
+    full render.
+    """
+
+    def __init__(
+        self,
+        colorize_fn: Callable[..., np.ndarray] = colorize_topdown_map,
+        agent_radius_divisor: int = 32,
+    ) -> None:
+        self.colorize_fn = colorize_fn
+        self.agent_radius_divisor = agent_radius_divisor
+        self.reset()
+
+    def reset(self) -> None:
+        self._colorized = None
+        self._fitted = None
+        self._step = None
+        self._output_height = None
+
+    def render(
+        self, topdown_map_info: Dict[str, Any], output_height: int
+    ) -> np.ndarray:
+        top_down_map = topdown_map_info["map"]
+        fog_of_war_mask = topdown_map_info["fog_of_war_mask"]
+        step = topdown_map_info.get("step")
+
+        incremental = (
+            "dirty_region" in topdown_map_info
+            and step is not None
+            and self._step is not None
+            and step == self._step + 1
+            and output_height == self._output_height
+            and self._colorized.shape[:2] == top_down_map.shape[:2]
+        )
+        if not incremental:
+            self._colorized = np.ascontiguousarray(
+                self.colorize_fn(top_down_map, fog_of_war_mask)
+            )
+            self._build_sampling_grid(top_down_map.shape[:2], output_height)
+            self._fitted = self._resample(
+                slice(0, self._out_rows.shape[0]),
+                slice(0, self._out_cols.shape[0]),
+            )
+        elif topdown_map_info["dirty_region"] is not None:
+            self._update_region(
+                top_down_map, fog_of_war_mask, topdown_map_info["dirty_region"]
             )
+        self._step = step
 
-            # only paint if over a valid point
-            if img[r_x, r_y]:
-                drawpoint(img, (r_x, r_y), MAP_MP3D_WAYPOINT, meters_per_px)
+        return self._draw_agent(
+            self._fitted.copy(),
+            topdown_map_info["agent_map_coord"],
+            topdown_map_info["agent_angle"],
+        )
+
+    def _build_sampling_grid(
+        self, map_shape: Tuple[int, int], output_height: int
+    ) -> None:
+        """Source coordinates sampled by each output row and column, the
+        same rotation and scaling as colorize_draw_agent_and_fit_to_height.
+        """
+        height, width = map_shape
+        self._rotated = height > width
+        old_h, old_w = (width, height) if self._rotated else (height, width)
+        output_width = int(float(output_height) / old_h * old_w)
+        self._output_height = output_height
+        self._scale = (old_h / output_height, old_w / output_width)
+
+        # pixel-center aligned like cv2.resize
+        rot_rows = (np.arange(output_height) + 0.5) * self._scale[0] - 0.5
+        rot_cols = (np.arange(output_width) + 0.5) * self._scale[1] - 0.5
+        if self._rotated:
+            # np.rot90(m)[y, x] == m[x, width - 1 - y]
+            self._out_rows = (width - 1 - rot_rows).astype(np.float32)
+            self._out_cols = rot_cols.astype(np.float32)
+        else:
+            self._out_rows = rot_rows.astype(np.float32)
+            self._out_cols = rot_cols.astype(np.float32)
+
+    def _resample(self, rows: slice, cols: slice) -> np.ndarray:
+        out_rows = self._out_rows[rows]
+        out_cols = self._out_cols[cols]
+        if self._rotated:
+            # output rows sample map columns, output columns map rows
+            map_x, map_y = np.meshgrid(out_rows, out_cols, indexing="ij")
+        else:
+            map_y, map_x = np.meshgrid(out_rows, out_cols, indexing="ij")
+        return cv2.remap(
+            self._colorized,
+            map_x,
+            map_y,
+            interpolation=cv2.INTER_CUBIC,
+            borderMode=cv2.BORDER_REPLICATE,
+        )
+
+    def _update_region(
+        self,
+        top_down_map: np.ndarray,
+        fog_of_war_mask: Optional[np.ndarray],
+        dirty_region: Tuple[int, int, int, int],
+    ) -> None:
+        height, width = top_down_map.shape[:2]
+        r0, r1 = max(dirty_region[0], 0), min(dirty_region[1] + 1, height)
+        c0, c1 = max(dirty_region[2], 0), min(dirty_region[3] + 1, width)
+        if r0 >= r1 or c0 >= c1:
+            return
+
+        self._colorized[r0:r1, c0:c1] = self.colorize_fn(
+            top_down_map[r0:r1, c0:c1],
+            None
+            if fog_of_war_mask is None
+            else fog_of_war_mask[r0:r1, c0:c1],
+        )
+
+        # bicubic sampling reads two source pixels on each side
+        if self._rotated:
+            rows = self._affected(self._out_rows, c0, c1)
+            cols = self._affected(self._out_cols, r0, r1)
+        else:
+            rows = self._affected(self._out_rows, r0, r1)
+            cols = self._affected(self._out_cols, c0, c1)
+        if rows is not None and cols is not None:
+            self._fitted[rows, cols] = self._resample(rows, cols)
+
+    @staticmethod
+    def _affected(
+        sample_coords: np.ndarray, lo: int, hi: int
+    ) -> Optional[slice]:
+        in_reach = (sample_coords > lo - 3) & (sample_coords < hi + 2)
+        idx = np.nonzero(in_reach)[0]
+        if len(idx) == 0:
+            return None
+        return slice(idx.min(), idx.max() + 1)
+
+    def _draw_agent(
+        self,
+        image: np.ndarray,
+        agent_map_coord: Tuple[int, int],
+        agent_angle: float,
+    ) -> np.ndarray:
+        height, width = self._colorized.shape[:2]
+        row, col = agent_map_coord
+        if self._rotated:
+            row, col = width - 1 - col, row
+            agent_angle = agent_angle + np.pi / 2
+        radius = (min(height, width) // self.agent_radius_divisor) / max(
+            self._scale
+        )
+        return habitat_maps.draw_agent(
+            image=image,
+            agent_center_coord=(
+                int((row + 0.5) / self._scale[0] - 0.5),
+                int((col + 0.5) / self._scale[1] - 0.5),
+            ),
+            agent_rotation=agent_angle,
+            agent_radius_px=max(int(radius), 1),
+        )
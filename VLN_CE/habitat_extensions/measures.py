@@ -1,7 +1,6 @@
 import gzip
 import json
-import pickle
-from typing import Any, List, Union
+from typing import Any, Callable, List, Tuple, Union
 
 import numpy as np
 from dtw import dtw
@@ -21,6 +20,9 @@ from habitat.utils.visualizations import maps as habitat_maps
 from numpy import ndarray
 
 from VLN_CE.habitat_extensions import maps
+from VLN_CE.habitat_extensions.graph_store import load_scene_graphs
+from VLN_CE.habitat_extensions.gt_index import load_gt_path_index
+from VLN_CE.habitat_extensions.map_cache import TopDownMapCache
 from VLN_CE.habitat_extensions.task import RxRVLNCEDatasetV1
 
 cv2 = try_cv2_import()
@@ -233,10 +235,56 @@ class WaypointRewardMeasure(Measure):
         return "waypoint_reward_measure"
 
 
+class IncrementalDTW:
+    """Exact dynamic time warping between a growing query sequence and a
+    fixed reference sequence. Only the last row of the accumulated cost
+    matrix is kept, so each new query point costs O(m) for a reference of
+    length m instead of recomputing the full O(n*m) matrix. Matches
+    `dtw(query, reference, dist=euclidean_distance)[0]` up to floating point
+    rounding.
+    """
+
+    def __init__(self, reference: Union[List[List[float]], ndarray]) -> None:
+        self._reference = np.asarray(reference, dtype=np.float64)
+        self._row = None
+
+    @property
+    def distance(self) -> float:
+        assert self._row is not None, "no query points have been added."
+        return float(self._row[-1])
+
+    def update(self, point: Union[List[float], ndarray]) -> float:
+        """Extends the accumulated cost matrix by the row for `point` and
+        returns the DTW distance of the query sequence so far.
+        """
+        cost = np.linalg.norm(
+            self._reference - np.asarray(point, dtype=np.float64), axis=1
+        )
+        prefix = np.cumsum(cost)
+        if self._row is None:
+            self._row = prefix
+            return self.distance
+
+        # vertical (i-1, j) and diagonal (i-1, j-1) predecessors
+        from_prev_row = cost + np.minimum(
+            self._row, np.concatenate(([np.inf], self._row[:-1]))
+        )
+        # horizontal predecessors: row[j] = min(from_prev_row[j],
+        # cost[j] + row[j-1]), solved in closed form with prefix sums.
+        self._row = np.minimum.accumulate(from_prev_row - prefix) + prefix
+        return self.distance
+
+
 @registry.register_measure
 class NDTW(Measure):
     """NDTW (Normalized Dynamic Time Warping)
     ref: https://arxiv.org/abs/1907.05446
+
+    FDTW=True (default) uses `fastdtw` over the whole trajectory. It is
+    computed when the metric is read rather than on every move, so callers
+    that only read metrics at the end of an episode pay for it once.
+    FDTW=False computes exact DTW incrementally (O(m) per step); its values
+    differ from fastdtw's.
     """
 
     cls_uuid: str = "ndtw"
@@ -247,19 +295,23 @@ class NDTW(Measure):
         self._sim = sim
         self._config = config
         self.dtw_func = fastdtw if config.FDTW else dtw
+        self._incremental_dtw = None
 
         if "{role}" in config.GT_PATH:
-            self.gt_json = {}
-            for role in RxRVLNCEDatasetV1.annotation_roles:
-                with gzip.open(
-                    config.GT_PATH.format(split=config.SPLIT, role=role), "rt"
-                ) as f:
-                    self.gt_json.update(json.load(f))
+            gt_files = [
+                config.GT_PATH.format(split=config.SPLIT, role=role)
+                for role in RxRVLNCEDatasetV1.annotation_roles
+            ]
         else:
-            with gzip.open(
-                config.GT_PATH.format(split=config.SPLIT), "rt"
-            ) as f:
-                self.gt_json = json.load(f)
+            gt_files = [config.GT_PATH.format(split=config.SPLIT)]
+
+        # prefer the shared memory-mapped index (see gt_index.py)
+        self.gt_index = load_gt_path_index(gt_files)
+        self.gt_json = {}
+        if self.gt_index is None:
+            for gt_file in gt_files:
+                with gzip.open(gt_file, "rt") as f:
+                    self.gt_json.update(json.load(f))
 
         super().__init__()
 
@@ -268,7 +320,12 @@ class NDTW(Measure):
 
     def reset_metric(self, *args: Any, episode, **kwargs: Any):
         self.locations = []
-        self.gt_locations = self.gt_json[episode.episode_id]["locations"]
+        if self.gt_index is not None:
+            self.gt_locations = self.gt_index.locations(episode.episode_id)
+        else:
+            self.gt_locations = self.gt_json[episode.episode_id]["locations"]
+        if not self._config.FDTW:
+            self._incremental_dtw = IncrementalDTW(self.gt_locations)
         self.update_metric()
 
     def update_metric(self, *args: Any, **kwargs: Any):
@@ -280,15 +337,28 @@ class NDTW(Measure):
                 return
             self.locations.append(current_position)
 
-        dtw_distance = self.dtw_func(
-            self.locations, self.gt_locations, dist=euclidean_distance
-        )[0]
+        if self._incremental_dtw is not None:
+            self._metric = self._ndtw(
+                self._incremental_dtw.update(current_position)
+            )
+        else:
+            # stale until read, see get_metric
+            self._metric = None
+
+    def get_metric(self):
+        if self._metric is None:
+            self._metric = self._ndtw(
+                self.dtw_func(
+                    self.locations, self.gt_locations, dist=euclidean_distance
+                )[0]
+            )
+        return self._metric
 
-        nDTW = np.exp(
+    def _ndtw(self, dtw_distance: float) -> float:
+        return np.exp(
             -dtw_distance
             / (len(self.gt_locations) * self._config.SUCCESS_DISTANCE)
         )
-        self._metric = nDTW
 
 
 @registry.register_measure
@@ -309,9 +379,16 @@ class SDTW(Measure):
         self.update_metric(task=task)
 
     def update_metric(self, *args: Any, task: EmbodiedTask, **kwargs: Any):
-        ep_success = task.measurements.measures[Success.cls_uuid].get_metric()
-        nDTW = task.measurements.measures[NDTW.cls_uuid].get_metric()
-        self._metric = ep_success * nDTW
+        # read lazily so that a fastdtw NDTW is not forced every step
+        self._measures = task.measurements.measures
+        self._metric = None
+
+    def get_metric(self):
+        if self._metric is None:
+            ep_success = self._measures[Success.cls_uuid].get_metric()
+            nDTW = self._measures[NDTW.cls_uuid].get_metric()
+            self._metric = ep_success * nDTW
+        return self._metric
 
 
 @registry.register_measure
@@ -332,20 +409,28 @@ class TopDownMapVLNCE(Measure):
         self._previous_xy_location = None
         self._top_down_map = None
         self._meters_per_pixel = None
+        self._dirty_region = None
         self.current_node = ""
-        with open(self._config.GRAPHS_FILE, "rb") as f:
-            self._conn_graphs = pickle.load(f)
+        self._conn_graphs = load_scene_graphs(
+            config.GRAPHS_FILE, config.GRAPHS_CACHE_SIZE
+        )
+        self._map_cache = TopDownMapCache(
+            config.MAP_CACHE_SIZE_MB, config.MAP_CACHE_DIR
+        )
         super().__init__()
 
     def _get_uuid(self, *args: Any, **kwargs: Any) -> str:
         return self.cls_uuid
 
     def get_original_map(self) -> ndarray:
-        top_down_map = habitat_maps.get_topdown_map_from_sim(
-            self._sim,
-            map_resolution=self._map_resolution,
-            draw_border=self._config.DRAW_BORDER,
-            meters_per_pixel=self._meters_per_pixel,
+        top_down_map = self._cached_map(
+            self._base_map_key(),
+            lambda: habitat_maps.get_topdown_map_from_sim(
+                self._sim,
+                map_resolution=self._map_resolution,
+                draw_border=self._config.DRAW_BORDER,
+                meters_per_pixel=self._meters_per_pixel,
+            ),
         )
 
         self._fog_of_war_mask = None
@@ -354,6 +439,57 @@ class TopDownMapVLNCE(Measure):
 
         return top_down_map
 
+    def get_static_map(self, episode: Episode) -> ndarray:
+        """The original map plus the MP3D nodes of the start floor. Both
+        layers are cached across episodes of the same scene and floor.
+        """
+        top_down_map = self.get_original_map()
+        if not self._config.DRAW_FIXED_WAYPOINTS:
+            return top_down_map
+
+        graph = self._conn_graphs[self._scene_id]
+        start_node = maps.get_nearest_node(
+            graph, (episode.start_position[0], episode.start_position[2])
+        )
+        node_height = float(graph.nodes[start_node]["position"][1])
+
+        def draw_nodes() -> ndarray:
+            maps.draw_mp3d_nodes(
+                top_down_map,
+                self._sim,
+                episode,
+                graph,
+                self._meters_per_pixel,
+            )
+            return top_down_map
+
+        return self._cached_map(
+            self._base_map_key() + ("nodes", round(node_height, 2)),
+            draw_nodes,
+        )
+
+    def _base_map_key(self) -> Tuple[Any, ...]:
+        # get_topdown_map_from_sim rasterizes the navmesh at the agent height
+        agent_height = float(self._sim.get_agent(0).state.position[1])
+        return (
+            self._scene_id,
+            round(agent_height, 2),
+            self._map_resolution,
+            int(self._config.DRAW_BORDER),
+        )
+
+    def _cached_map(
+        self, key: Tuple[Any, ...], render: Callable[[], ndarray]
+    ) -> ndarray:
+        """Returns a writable copy of the cached map, rendering it first on
+        a cache miss.
+        """
+        top_down_map = self._map_cache.get(key)
+        if top_down_map is None:
+            top_down_map = render()
+            self._map_cache.put(key, top_down_map)
+        return top_down_map.copy()
+
     def reset_metric(
         self, *args: Any, episode: Episode, **kwargs: Any
     ) -> None:
@@ -363,7 +499,9 @@ class TopDownMapVLNCE(Measure):
         self._meters_per_pixel = habitat_maps.calculate_meters_per_pixel(
             self._map_resolution, self._sim
         )
-        self._top_down_map = self.get_original_map()
+        # MP3D nodes only land on valid points, so drawing them before
+        # revealing the fog of war does not change the revealed area
+        self._top_down_map = self.get_static_map(episode)
         agent_position = self._sim.get_agent_state().position
         scene_id = episode.scene_id.split("/")[-1].split(".")[0]
         a_x, a_y = habitat_maps.to_grid(
@@ -387,15 +525,6 @@ class TopDownMapVLNCE(Measure):
                 ),
             )
 
-        if self._config.DRAW_FIXED_WAYPOINTS:
-            maps.draw_mp3d_nodes(
-                self._top_down_map,
-                self._sim,
-                episode,
-                self._conn_graphs[scene_id],
-                self._meters_per_pixel,
-            )
-
         if self._config.DRAW_SHORTEST_PATH:
             shortest_path_points = self._sim.get_straight_shortest_path_points(
                 agent_position, episode.goals[0].position
@@ -460,8 +589,30 @@ class TopDownMapVLNCE(Measure):
                 )
             },
             "meters_per_px": self._meters_per_pixel,
+            # lets maps.TopDownMapRenderer recolor only what this step drew
+            "step": self._step_count,
+            "dirty_region": self._dirty_region,
         }
 
+    def _mark_dirty(self, rows: List[int], cols: List[int], pad: int) -> None:
+        """Grows the (row_min, row_max, col_min, col_max) box of map cells
+        changed in this step, inclusive and possibly out of bounds.
+        """
+        region = (
+            min(rows) - pad,
+            max(rows) + pad,
+            min(cols) - pad,
+            max(cols) + pad,
+        )
+        if self._dirty_region is not None:
+            region = (
+                min(region[0], self._dirty_region[0]),
+                max(region[1], self._dirty_region[1]),
+                min(region[2], self._dirty_region[2]),
+                max(region[3], self._dirty_region[3]),
+            )
+        self._dirty_region = tuple(int(r) for r in region)
+
     def get_polar_angle(self) -> float:
         agent_state = self._sim.get_agent_state()
         # quaternion is in x, y, z, w format
@@ -482,34 +633,45 @@ class TopDownMapVLNCE(Measure):
             self._top_down_map.shape[0:2],
             self._sim,
         )
+        self._dirty_region = None
         # Don't draw over the source point
         gradient_color = 15 + min(
             self._step_count * 245 // self._config.MAX_EPISODE_STEPS, 245
         )
         if self._top_down_map[a_x, a_y] != maps.MAP_SOURCE_POINT_INDICATOR:
+            thickness = int(
+                self._map_resolution * 1.4 / maps.MAP_THICKNESS_SCALAR
+            )
             maps.drawline(
                 self._top_down_map,
                 self._previous_xy_location,
                 (a_y, a_x),
                 gradient_color,
-                thickness=int(
-                    self._map_resolution * 1.4 / maps.MAP_THICKNESS_SCALAR
-                ),
+                thickness=thickness,
                 style="filled",
             )
+            self._mark_dirty(
+                [self._previous_xy_location[1], a_x],
+                [self._previous_xy_location[0], a_y],
+                thickness + 1,
+            )
 
         if self._config.FOG_OF_WAR.DRAW:
+            max_line_len = (
+                self._config.FOG_OF_WAR.VISIBILITY_DIST
+                / habitat_maps.calculate_meters_per_pixel(
+                    self._map_resolution, sim=self._sim
+                )
+            )
             self._fog_of_war_mask = fog_of_war.reveal_fog_of_war(
                 self._top_down_map,
                 self._fog_of_war_mask,
                 np.array([a_x, a_y]),
                 self.get_polar_angle(),
                 self._config.FOG_OF_WAR.FOV,
-                max_line_len=self._config.FOG_OF_WAR.VISIBILITY_DIST
-                / habitat_maps.calculate_meters_per_pixel(
-                    self._map_resolution, sim=self._sim
-                ),
+                max_line_len=max_line_len,
             )
+            self._mark_dirty([a_x], [a_y], int(max_line_len) + 1)
 
         point_padding = int(0.2 / self._meters_per_pixel)
         prev_nearest_node = self._nearest_node
@@ -543,18 +705,22 @@ class TopDownMapVLNCE(Measure):
                 + 1,
             ] = gradient_color
 
+            thickness = int(
+                1.0
+                / 2.0
+                * np.round(self._map_resolution / maps.MAP_THICKNESS_SCALAR)
+            )
             maps.drawline(
                 self._top_down_map,
                 (prev_s_y, prev_s_x),
                 (self.s_y, self.s_x),
                 gradient_color,
-                thickness=int(
-                    1.0
-                    / 2.0
-                    * np.round(
-                        self._map_resolution / maps.MAP_THICKNESS_SCALAR
-                    )
-                ),
+                thickness=thickness,
+            )
+            self._mark_dirty(
+                [prev_s_x, self.s_x],
+                [prev_s_y, self.s_y],
+                max(int(2.0 / 3.0 * point_padding), thickness) + 1,
             )
 
         self._previous_xy_location = (a_y, a_x)
@@ -10,6 +10,10 @@ from habitat.sims.habitat_simulator.actions import HabitatSimActions
 from habitat.tasks.nav.shortest_path_follower import ShortestPathFollower
 from numpy import ndarray
 
+from VLN_CE.habitat_extensions.feature_store import (
+    feature_key,
+    load_feature_store,
+)
 from VLN_CE.habitat_extensions.shortest_path_follower import (
     ShortestPathFollowerCompat,
 )
@@ -135,7 +139,12 @@ class ShortestPathSensor(Sensor):
         cls = ShortestPathFollower
         if config.USE_ORIGINAL_FOLLOWER:
             cls = ShortestPathFollowerCompat
-        self.follower = cls(sim, config.GOAL_RADIUS, return_one_hot=False)
+        kwargs = {}
+        if config.USE_ORIGINAL_FOLLOWER:
+            kwargs["probe_free"] = config.PROBE_FREE
+        self.follower = cls(
+            sim, config.GOAL_RADIUS, return_one_hot=False, **kwargs
+        )
 
     def _get_uuid(self, *args: Any, **kwargs: Any):
         return self.cls_uuid
@@ -158,12 +167,17 @@ class RxRInstructionSensor(Sensor):
     """Loads pre-computed intruction features from disk in the baseline RxR
     BERT file format.
     https://github.com/google-research-datasets/RxR/tree/7a6b87ba07959f5176aa336192a8c5dc85ca1b8e#downloading-bert-text-features
+    Reads from the packed store of feature_store.py when one exists. The
+    padded features are cached for the current instruction, so the same array
+    is returned on every step of an episode and must not be modified.
     """
 
     cls_uuid: str = "rxr_instruction"
 
     def __init__(self, *args: Any, config: Config, **kwargs: Any):
         self.features_path = config.features_path
+        self._cache_key = None
+        self._cached_feats = None
         super().__init__(config=config)
 
     def _get_uuid(self, *args: Any, **kwargs: Any) -> str:
@@ -180,17 +194,32 @@ class RxRInstructionSensor(Sensor):
             dtype=np.float,
         )
 
+    def _load_features(
+        self, split: str, instruction_id: int, lang: str
+    ) -> ndarray:
+        store = load_feature_store(self.features_path, split)
+        key = feature_key(instruction_id, lang)
+        if store is not None and key in store:
+            return store[key]
+
+        features_file = self.features_path.format(
+            split=split, id=instruction_id, lang=lang
+        )
+        return np.load(features_file)["features"]
+
     def get_observation(
         self, *args: Any, episode: VLNExtendedEpisode, **kwargs
     ):
-        features = np.load(
-            self.features_path.format(
-                split=episode.instruction.split,
-                id=int(episode.instruction.instruction_id),
-                lang=episode.instruction.language.split("-")[0],
-            )
+        cache_key = (
+            episode.instruction.split,
+            int(episode.instruction.instruction_id),
+            episode.instruction.language.split("-")[0],
         )
-        feats = np.zeros((512, 768), dtype=np.float32)
-        s = features["features"].shape
-        feats[: s[0], : s[1]] = features["features"]
-        return feats
+        if cache_key != self._cache_key:
+            features = self._load_features(*cache_key)
+            feats = np.zeros((512, 768), dtype=np.float32)
+            s = features.shape
+            feats[: s[0], : s[1]] = features
+            self._cache_key = cache_key
+            self._cached_feats = feats
+        return self._cached_feats
@@ -6,6 +6,7 @@ from typing import Optional, Union
 
 import habitat_sim
 import numpy as np
+import quaternion
 from habitat.sims.habitat_simulator.actions import HabitatSimActions
 from habitat.sims.habitat_simulator.habitat_simulator import HabitatSim
 from habitat.utils.geometry_utils import (
@@ -14,6 +15,8 @@ from habitat.utils.geometry_utils import (
 )
 
 EPSILON = 1e-6
+# action spaces whose turn and forward actions are noiseless
+NOISELESS_ACTION_SPACES = ["v0", "v1"]
 
 
 def action_to_one_hot(action: int) -> np.array:
@@ -32,10 +35,18 @@ class ShortestPathFollowerCompat:
         return_one_hot: If true, returns a one-hot encoding of the action
             (useful for training ML agents). If false, returns the
             SimulatorAction.
+        probe_free: If true, predicts the effect of turn and forward actions
+            with quaternion math and the navmesh move filter instead of
+            stepping the simulator and restoring the agent state. Ignored
+            (the follower probes) unless actuation is noiseless.
     """
 
     def __init__(
-        self, sim: HabitatSim, goal_radius: float, return_one_hot: bool = True
+        self,
+        sim: HabitatSim,
+        goal_radius: float,
+        return_one_hot: bool = True,
+        probe_free: bool = False,
     ):
         assert (
             getattr(sim, "geodesic_distance", None) is not None
@@ -55,6 +66,14 @@ class ShortestPathFollowerCompat:
             else "greedy"
         )
         self._return_one_hot = return_one_hot
+        self._probe_free = (
+            probe_free
+            and sim.habitat_config.ACTION_SPACE_CONFIG
+            in NOISELESS_ACTION_SPACES
+        )
+        self._allow_sliding = sim.habitat_config.HABITAT_SIM_V0.get(
+            "ALLOW_SLIDING", True
+        )
 
     def _get_return_value(self, action) -> Union[int, np.array]:
         if self._return_one_hot:
@@ -86,6 +105,14 @@ class ShortestPathFollowerCompat:
         alpha = angle_between_quaternions(grad_dir, current_state.rotation)
         if alpha <= np.deg2rad(self._sim.habitat_config.TURN_ANGLE) + EPSILON:
             return self._get_return_value(HabitatSimActions.MOVE_FORWARD)
+        elif self._probe_free:
+            left_rotation = self._turned(current_state.rotation, 1)
+            best_turn = (
+                HabitatSimActions.TURN_LEFT
+                if angle_between_quaternions(grad_dir, left_rotation) < alpha
+                else HabitatSimActions.TURN_RIGHT
+            )
+            return self._get_return_value(best_turn)
         else:
             sim_action = HabitatSimActions.TURN_LEFT
             self._sim.step(sim_action)
@@ -102,6 +129,50 @@ class ShortestPathFollowerCompat:
             self._reset_agent_state(current_state)
             return self._get_return_value(best_turn)
 
+    def _turned(
+        self, rotation: np.quaternion, num_turns: int
+    ) -> np.quaternion:
+        """Rotation after `num_turns` TURN_LEFT actions. Turns rotate the
+        agent about its local up axis, i.e. rotation * q(up, angle).
+        """
+        angle = num_turns * np.deg2rad(self._sim.habitat_config.TURN_ANGLE)
+        return rotation * quaternion.from_rotation_vector(
+            angle * np.asarray(self._sim.up_vector, dtype=np.float64)
+        )
+
+    def _forward_position(
+        self, position: np.ndarray, rotation: np.quaternion
+    ) -> np.ndarray:
+        """Position after MOVE_FORWARD, filtered by the navmesh like the
+        simulator's move filter.
+        """
+        heading = quaternion.rotate_vectors(
+            rotation, np.asarray(self._sim.forward_vector, dtype=np.float64)
+        )
+        target = (np.asarray(position) + self._step_size * heading).astype(
+            np.float32
+        )
+        if self._allow_sliding:
+            return np.array(self._sim.pathfinder.try_step(position, target))
+        return np.array(
+            self._sim.pathfinder.try_step_no_sliding(position, target)
+        )
+
+    def probe_free_parity(self, goal_pos: np.array) -> bool:
+        """Whether the probe-free and the probing follower choose the same
+        next action from the current agent state. Used by follower_parity.py
+        to validate PROBE_FREE on recorded episodes before enabling it.
+        """
+        probe_free = self._probe_free
+        try:
+            self._probe_free = True
+            predicted = self.get_next_action(goal_pos)
+            self._probe_free = False
+            probed = self.get_next_action(goal_pos)
+        finally:
+            self._probe_free = probe_free
+        return np.array_equal(predicted, probed)
+
     def _reset_agent_state(self, state: habitat_sim.AgentState) -> None:
         self._sim.set_agent_state(
             state.position, state.rotation, reset_sensors=False
@@ -134,6 +205,31 @@ class ShortestPathFollowerCompat:
             )
             max_grad_dir.x = 0
             max_grad_dir = np.normalized(max_grad_dir)
+        elif self._probe_free:
+            current_dist = self._geo_dist(goal_pos)
+            turn_angle = self._sim.habitat_config.TURN_ANGLE
+
+            best_geodesic_delta = -2 * self._max_delta
+            best_rotation = current_state.rotation
+            # same candidate order and early exit as the probing loop below
+            for i in range(len(range(0, 360, turn_angle))):
+                rotation = self._turned(current_state.rotation, i)
+                new_delta = current_dist - self._sim.geodesic_distance(
+                    self._forward_position(current_pos, rotation), goal_pos
+                )
+
+                if new_delta > best_geodesic_delta:
+                    best_rotation = rotation
+                    best_geodesic_delta = new_delta
+
+                if np.isclose(
+                    best_geodesic_delta,
+                    self._max_delta,
+                    rtol=1 - np.cos(np.deg2rad(turn_angle)),
+                ):
+                    break
+
+            max_grad_dir = best_rotation
         else:
             current_rotation = self._sim.get_agent_state().rotation
             current_dist = self._geo_dist(goal_pos)
@@ -0,0 +1,117 @@
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from habitat import logger
+from habitat.core.dataset import Episode
+from habitat.core.registry import registry
+from habitat.sims.habitat_simulator.habitat_simulator import HabitatSim
+
+# positions are quantized to this many meters in cache keys
+GEODESIC_CACHE_RESOLUTION = 1e-3
+
+
+class GeodesicDistanceCache:
+    """Geodesic distances keyed by quantized (start, goals). The navmesh of a
+    scene is static, so entries stay valid as the agent moves: positions the
+    follower probes or revisits are answered from the cache for the rest of
+    the episode. The simulator clears the cache between episodes.
+    """
+
+    def __init__(self, resolution: float = GEODESIC_CACHE_RESOLUTION):
+        self.resolution = resolution
+        self.hits = 0
+        self.misses = 0
+        self._distances: Dict[Tuple[int, ...], float] = {}
+
+    def key(
+        self,
+        position_a: Union[Sequence[float], np.ndarray],
+        position_b: Union[
+            Sequence[float], Sequence[Sequence[float]], np.ndarray
+        ],
+    ) -> Tuple[int, ...]:
+        # a single goal and a list holding only that goal share a key
+        points = np.concatenate(
+            [
+                np.asarray(position_a, dtype=np.float64).reshape(-1),
+                np.asarray(position_b, dtype=np.float64).reshape(-1),
+            ]
+        )
+        return tuple(np.round(points / self.resolution).astype(np.int64))
+
+    def get(self, key: Tuple[int, ...]) -> Optional[float]:
+        distance = self._distances.get(key)
+        if distance is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return distance
+
+    def put(self, key: Tuple[int, ...], distance: float) -> None:
+        self._distances[key] = distance
+
+    def clear(self) -> None:
+        self._distances.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
+
+@registry.register_simulator(name="VLNCESim-v0")
+class VLNCESim(HabitatSim):
+    """HabitatSim whose `geodesic_distance` goes through a per-episode
+    GeodesicDistanceCache. Opt in with SIMULATOR.TYPE = "VLNCESim-v0". The
+    cache statistics of each episode are logged when it ends, i.e. on the
+    next reset or on close.
+    """
+
+    def __init__(self, config: Any) -> None:
+        self.geodesic_cache = GeodesicDistanceCache()
+        super().__init__(config)
+
+    def _end_cache_episode(self) -> None:
+        if self.geodesic_cache.hits + self.geodesic_cache.misses > 0:
+            logger.info(
+                f"Geodesic distance cache: {self.geodesic_cache_stats()}"
+            )
+        self.geodesic_cache.clear()
+
+    def reset(self):
+        # reconfigure has already loaded the scene of the new episode
+        self._end_cache_episode()
+        return super().reset()
+
+    def close(self) -> None:
+        self._end_cache_episode()
+        super().close()
+
+    def geodesic_distance(
+        self,
+        position_a: Union[Sequence[float], np.ndarray],
+        position_b: Union[
+            Sequence[float], Sequence[Sequence[float]], np.ndarray
+        ],
+        episode: Optional[Episode] = None,
+    ) -> float:
+        key = self.geodesic_cache.key(position_a, position_b)
+        distance = self.geodesic_cache.get(key)
+        if distance is None:
+            distance = super().geodesic_distance(
+                position_a, position_b, episode
+            )
+            self.geodesic_cache.put(key, distance)
+        return distance
+
+    def geodesic_cache_stats(self) -> Dict[str, float]:
+        return self.geodesic_cache.stats()
@@ -1,7 +1,8 @@
 import gzip
 import json
 import os
-from typing import Dict, List, Optional, Union
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import attr
 from habitat.config import Config
@@ -12,6 +13,13 @@ from habitat.datasets.utils import VocabDict
 from habitat.tasks.nav.nav import NavigationGoal
 from habitat.tasks.vln.vln import InstructionData, VLNEpisode
 
+from VLN_CE.habitat_extensions.episode_store import (
+    EpisodeStore,
+    load_episode_store,
+    scene_name,
+    shard_slice,
+)
+
 DEFAULT_SCENE_PATH_PREFIX = "data/scene_datasets/"
 ALL_LANGUAGES_MASK = "*"
 ALL_ROLES_MASK = "*"
@@ -42,6 +50,50 @@ class VLNExtendedEpisode(VLNEpisode):
     trajectory_id: Optional[Union[int, str]] = attr.ib(default=None)
 
 
+def _select_from_stores(
+    stores: List[EpisodeStore],
+    config: Config,
+    languages: Optional[List[str]] = None,
+) -> List[Tuple[EpisodeStore, int]]:
+    """Applies the scene, episode, language and shard filters of `config` to
+    the store columns. Returns (store, row) pairs in file order, like the
+    json path, or sorted by (scene, episode ID) when sharding. No record is
+    decoded.
+    """
+    scenes = None
+    if ALL_SCENES_MASK not in config.CONTENT_SCENES:
+        scenes = config.CONTENT_SCENES
+    episode_ids = None
+    if ALL_EPISODES_MASK not in config.EPISODES_ALLOWED:
+        episode_ids = config.EPISODES_ALLOWED
+
+    selected = [
+        (store, row)
+        for store in stores
+        for row in store.select_rows(scenes, episode_ids, languages)
+    ]
+    if config.NUM_SHARDS == 1:
+        return selected
+    selected.sort(key=lambda s: (s[0].scene(s[1]), s[0].episode_ids[s[1]]))
+    return selected[
+        shard_slice(len(selected), config.NUM_SHARDS, config.SHARD_ID)
+    ]
+
+
+def _shard_episodes(
+    episodes: List[VLNEpisode], config: Config
+) -> List[VLNEpisode]:
+    """Same shard as `_select_from_stores` for episodes parsed from json."""
+    if config.NUM_SHARDS == 1:
+        return episodes
+    episodes = sorted(
+        episodes, key=lambda e: (scene_name(e.scene_id), str(e.episode_id))
+    )
+    return episodes[
+        shard_slice(len(episodes), config.NUM_SHARDS, config.SHARD_ID)
+    ]
+
+
 @registry.register_dataset(name="VLN-CE-v1")
 class VLNCEDatasetV1(Dataset):
     """Loads the R2R VLN-CE dataset"""
@@ -56,6 +108,17 @@ class VLNCEDatasetV1(Dataset):
             return
 
         dataset_filename = config.DATA_PATH.format(split=config.SPLIT)
+        store = load_episode_store(dataset_filename)
+        if store is not None:
+            self.instruction_vocab = VocabDict(
+                word_list=store.instruction_vocab["word_list"]
+            )
+            self.episodes = [
+                self._episode_from_dict(s.record(row), config.SCENES_DIR)
+                for s, row in _select_from_stores([store], config)
+            ]
+            return
+
         with gzip.open(dataset_filename, "rt") as f:
             self.from_json(f.read(), scenes_dir=config.SCENES_DIR)
 
@@ -76,6 +139,8 @@ class VLNCEDatasetV1(Dataset):
                 if episode.episode_id not in ep_ids_to_purge
             ]
 
+        self.episodes = _shard_episodes(self.episodes, config)
+
     def from_json(
         self, json_str: str, scenes_dir: Optional[str] = None
     ) -> None:
@@ -86,33 +151,51 @@ class VLNCEDatasetV1(Dataset):
         )
 
         for episode in deserialized["episodes"]:
-            # cast integer IDs to strings
-            episode["episode_id"] = str(episode["episode_id"])
-            episode["trajectory_id"] = str(episode["trajectory_id"])
+            self.episodes.append(self._episode_from_dict(episode, scenes_dir))
+
+    @staticmethod
+    def _episode_from_dict(
+        episode: Dict[str, Any], scenes_dir: Optional[str] = None
+    ) -> VLNExtendedEpisode:
+        # cast integer IDs to strings
+        episode["episode_id"] = str(episode["episode_id"])
+        episode["trajectory_id"] = str(episode["trajectory_id"])
 
-            episode = VLNExtendedEpisode(**episode)
+        episode = VLNExtendedEpisode(**episode)
 
-            if scenes_dir is not None:
-                if episode.scene_id.startswith(DEFAULT_SCENE_PATH_PREFIX):
-                    episode.scene_id = episode.scene_id[
-                        len(DEFAULT_SCENE_PATH_PREFIX) :
-                    ]
+        if scenes_dir is not None:
+            if episode.scene_id.startswith(DEFAULT_SCENE_PATH_PREFIX):
+                episode.scene_id = episode.scene_id[
+                    len(DEFAULT_SCENE_PATH_PREFIX) :
+                ]
 
-                episode.scene_id = os.path.join(scenes_dir, episode.scene_id)
+            episode.scene_id = os.path.join(scenes_dir, episode.scene_id)
 
-            episode.instruction = InstructionData(**episode.instruction)
-            if episode.goals is not None:
-                for g_index, goal in enumerate(episode.goals):
-                    episode.goals[g_index] = NavigationGoal(**goal)
-            self.episodes.append(episode)
+        episode.instruction = InstructionData(**episode.instruction)
+        if episode.goals is not None:
+            for g_index, goal in enumerate(episode.goals):
+                episode.goals[g_index] = NavigationGoal(**goal)
+        return episode
 
     @classmethod
     def get_scenes_to_load(cls, config: Config) -> List[str]:
         """Return a sorted list of scenes"""
+        return sorted(cls.get_scene_episode_counts(config))
+
+    @classmethod
+    def get_scene_episode_counts(cls, config: Config) -> Dict[str, int]:
+        """Number of episodes of each scene that passes the filters."""
         assert cls.check_config_paths_exist(config)
+        store = load_episode_store(config.DATA_PATH.format(split=config.SPLIT))
+        if store is not None:
+            selected = _select_from_stores([store], config)
+            return dict(Counter(s.scene(row) for s, row in selected))
+
         dataset = cls(config)
-        return sorted(
-            {cls.scene_from_scene_path(e.scene_id) for e in dataset.episodes}
+        return dict(
+            Counter(
+                cls.scene_from_scene_path(e.scene_id) for e in dataset.episodes
+            )
         )
 
     @staticmethod
@@ -138,6 +221,16 @@ class RxRVLNCEDatasetV1(Dataset):
         if config is None:
             return
 
+        stores = self._load_stores(config)
+        if stores is not None:
+            self.episodes = [
+                self._episode_from_dict(s.record(row), config.SCENES_DIR)
+                for s, row in _select_from_stores(
+                    stores, config, self._languages_from_config(config)
+                )
+            ]
+            return
+
         for role in self.extract_roles_from_config(config):
             with gzip.open(
                 config.DATA_PATH.format(split=config.SPLIT, role=role), "rt"
@@ -169,6 +262,8 @@ class RxRVLNCEDatasetV1(Dataset):
                 if episode.episode_id not in ep_ids_to_purge
             ]
 
+        self.episodes = _shard_episodes(self.episodes, config)
+
     def from_json(
         self, json_str: str, scenes_dir: Optional[str] = None
     ) -> None:
@@ -176,32 +271,66 @@ class RxRVLNCEDatasetV1(Dataset):
         deserialized = json.loads(json_str)
 
         for episode in deserialized["episodes"]:
-            episode = VLNExtendedEpisode(**episode)
+            self.episodes.append(self._episode_from_dict(episode, scenes_dir))
 
-            if scenes_dir is not None:
-                if episode.scene_id.startswith(DEFAULT_SCENE_PATH_PREFIX):
-                    episode.scene_id = episode.scene_id[
-                        len(DEFAULT_SCENE_PATH_PREFIX) :
-                    ]
+    def _episode_from_dict(
+        self, episode: Dict[str, Any], scenes_dir: Optional[str] = None
+    ) -> VLNExtendedEpisode:
+        episode = VLNExtendedEpisode(**episode)
 
-                episode.scene_id = os.path.join(scenes_dir, episode.scene_id)
+        if scenes_dir is not None:
+            if episode.scene_id.startswith(DEFAULT_SCENE_PATH_PREFIX):
+                episode.scene_id = episode.scene_id[
+                    len(DEFAULT_SCENE_PATH_PREFIX) :
+                ]
 
-            episode.instruction = ExtendedInstructionData(
-                **episode.instruction
+            episode.scene_id = os.path.join(scenes_dir, episode.scene_id)
+
+        episode.instruction = ExtendedInstructionData(**episode.instruction)
+        episode.instruction.split = self.config.SPLIT
+        if episode.goals is not None:
+            for g_index, goal in enumerate(episode.goals):
+                episode.goals[g_index] = NavigationGoal(**goal)
+        return episode
+
+    @classmethod
+    def _load_stores(cls, config: Config) -> Optional[List[EpisodeStore]]:
+        """One episode store per role or None if any role is unconverted."""
+        stores = [
+            load_episode_store(
+                config.DATA_PATH.format(split=config.SPLIT, role=role)
             )
-            episode.instruction.split = self.config.SPLIT
-            if episode.goals is not None:
-                for g_index, goal in enumerate(episode.goals):
-                    episode.goals[g_index] = NavigationGoal(**goal)
-            self.episodes.append(episode)
+            for role in cls.extract_roles_from_config(config)
+        ]
+        return None if any(s is None for s in stores) else stores
+
+    @staticmethod
+    def _languages_from_config(config: Config) -> Optional[List[str]]:
+        if ALL_LANGUAGES_MASK in config.LANGUAGES:
+            return None
+        return config.LANGUAGES
 
     @classmethod
     def get_scenes_to_load(cls, config: Config) -> List[str]:
         """Return a sorted list of scenes"""
+        return sorted(cls.get_scene_episode_counts(config))
+
+    @classmethod
+    def get_scene_episode_counts(cls, config: Config) -> Dict[str, int]:
+        """Number of episodes of each scene that passes the filters."""
         assert cls.check_config_paths_exist(config)
+        stores = cls._load_stores(config)
+        if stores is not None:
+            selected = _select_from_stores(
+                stores, config, cls._languages_from_config(config)
+            )
+            return dict(Counter(s.scene(row) for s, row in selected))
+
         dataset = cls(config)
-        return sorted(
-            {cls.scene_from_scene_path(e.scene_id) for e in dataset.episodes}
+        return dict(
+            Counter(
+                cls.scene_from_scene_path(e.scene_id) for e in dataset.episodes
+            )
         )
 
     @classmethod
@@ -6,8 +6,15 @@ import habitat_sim
 import numpy as np
 import quaternion
 import torch
+from habitat import Env
 from habitat.core.simulator import Simulator
 from habitat.core.utils import try_cv2_import
+from habitat.sims.habitat_simulator.actions import HabitatSimActions
+from habitat.tasks.nav.nav import (
+    MoveForwardAction,
+    TurnLeftAction,
+    TurnRightAction,
+)
 from habitat.tasks.utils import cartesian_to_polar
 from habitat.utils.geometry_utils import (
     quaternion_rotate_vector,
@@ -771,3 +778,59 @@ def rtheta_to_global_coordinates(
     if dimensionality == 2:
         return [position[0], position[2]]
     return position
+
+
+# task actions step_without_observations can execute: their step() only
+# forwards to the simulator action
+RENDER_FREE_ACTIONS = {
+    MoveForwardAction: HabitatSimActions.MOVE_FORWARD,
+    TurnLeftAction: HabitatSimActions.TURN_LEFT,
+    TurnRightAction: HabitatSimActions.TURN_RIGHT,
+}
+
+
+def step_without_observations(env: Env, action: int) -> None:
+    """Same as `habitat.Env.step` for a primitive action but without
+    rendering sensors: the agent moves through habitat-sim's navmesh move
+    filter, then measures and step counts are updated so metrics such as
+    path length still see every primitive.
+
+    `EmbodiedTask.step` is bypassed, so only task actions whose step() has
+    no task-level logic (RENDER_FREE_ACTIONS) are accepted. The collision
+    flag is stored in HabitatSim's last observations, where
+    `previous_step_collided` and the Collisions measure read it.
+    """
+    task_action = env.task.actions[env.task.get_action_name(action)]
+    assert (
+        type(task_action) in RENDER_FREE_ACTIONS
+    ), f"{type(task_action).__name__} cannot be stepped without observations."
+
+    sim = env.sim
+    collided = sim.get_agent(0).act(RENDER_FREE_ACTIONS[type(task_action)])
+    if getattr(sim, "_prev_sim_obs", None) is not None:
+        sim._prev_sim_obs["collided"] = collided
+
+    env.task.measurements.update_measures(
+        episode=env.current_episode,
+        action={"action": action},
+        task=env.task,
+    )
+    env._update_step_stats()
+
+
+def render_observations(env: Env) -> Dict[str, Any]:
+    """Sensor and task observations at the current agent pose, e.g. after
+    moving with `step_without_observations`.
+    """
+    agent_state = env.sim.get_agent_state()
+    observations = env.sim.get_observations_at(
+        agent_state.position, agent_state.rotation, True
+    )
+    observations.update(
+        env.task.sensor_suite.get_observations(
+            observations=observations,
+            episode=env.current_episode,
+            task=env.task,
+        )
+    )
+    return observations
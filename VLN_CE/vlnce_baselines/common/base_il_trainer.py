@@ -26,7 +26,10 @@ from habitat_baselines.utils.common import batch_obs
 
 from habitat_extensions.utils import generate_video, observations_to_image
 from vlnce_baselines.common.aux_losses import AuxLosses
-from vlnce_baselines.common.env_utils import construct_envs_auto_reset_false
+from vlnce_baselines.common.env_utils import (
+    EpisodeScheduler,
+    construct_envs_auto_reset_false,
+)
 from vlnce_baselines.common.utils import extract_instruction_tokens
 
 with warnings.catch_warnings():
@@ -216,6 +219,31 @@ class BaseVLNCETrainer(BaseILTrainer):
             rgb_frames,
         )
 
+    @staticmethod
+    def _reset_to_next_episode(
+        envs, scheduler: EpisodeScheduler, idx: int
+    ) -> Optional[Dict[str, Any]]:
+        """Resets env `idx` to its next scheduled episode, fetching the
+        episode from the env holding it if needed.
+        Returns:
+            the observations of the episode or None if no episode is left
+        """
+        scheduled = scheduler.next_episode(idx)
+        if scheduled is None:
+            return None
+
+        owner, episode_id = scheduled
+        episode = None
+        if owner != idx:
+            episode = envs.call_at(
+                owner, "get_episode", {"episode_id": episode_id}
+            )
+        return envs.call_at(
+            idx,
+            "reset_to_episode",
+            {"episode_id": episode_id, "episode": episode},
+        )
+
     def _eval_checkpoint(
         self,
         checkpoint_path: str,
@@ -277,13 +305,42 @@ class BaseVLNCETrainer(BaseILTrainer):
         )
         self.policy.eval()
 
-        observations = envs.reset()
+        num_eps = sum(envs.number_of_episodes)
+        if config.EVAL.EPISODE_COUNT > -1:
+            num_eps = min(config.EVAL.EPISODE_COUNT, num_eps)
+
+        # finished envs are refilled with unevaluated episodes of any env, so
+        # the batch only shrinks once no episode is left
+        scheduler = None
+        if config.EVAL.REFILL_EPISODES and issubclass(
+            get_env_class(config.ENV_NAME), get_env_class("VLNCEDaggerEnv")
+        ):
+            scheduler = EpisodeScheduler(
+                envs.call(["episode_ids"] * envs.num_envs), num_eps
+            )
+            observations = [
+                self._reset_to_next_episode(envs, scheduler, i)
+                for i in range(envs.num_envs)
+            ]
+            # fewer episodes than envs
+            for idx in reversed(range(envs.num_envs)):
+                if observations[idx] is None:
+                    envs.pause_at(idx)
+                    scheduler.pause_at(idx)
+                    observations.pop(idx)
+        else:
+            observations = envs.reset()
+
         observations = extract_instruction_tokens(
             observations, self.config.TASK_CONFIG.TASK.INSTRUCTION_SENSOR_UUID
         )
         batch = batch_obs(observations, self.device)
         batch = apply_obs_transforms_batch(batch, self.obs_transforms)
 
+        num_slots = envs.num_envs
+        num_steps = 0
+        num_active_steps = 0
+
         rnn_states = torch.zeros(
             envs.num_envs,
             self.policy.net.num_recurrent_layers,
@@ -303,10 +360,6 @@ class BaseVLNCETrainer(BaseILTrainer):
         if len(config.VIDEO_OPTION) > 0:
             os.makedirs(config.VIDEO_DIR, exist_ok=True)
 
-        num_eps = sum(envs.number_of_episodes)
-        if config.EVAL.EPISODE_COUNT > -1:
-            num_eps = min(config.EVAL.EPISODE_COUNT, num_eps)
-
         pbar = tqdm.tqdm(total=num_eps) if config.use_pbar else None
         log_str = (
             f"[Ckpt: {checkpoint_index}]"
@@ -317,6 +370,8 @@ class BaseVLNCETrainer(BaseILTrainer):
 
         while envs.num_envs > 0 and len(stats_episodes) < num_eps:
             current_episodes = envs.current_episodes()
+            num_steps += 1
+            num_active_steps += envs.num_envs
 
             with torch.no_grad():
                 actions, rnn_states = self.policy.act(
@@ -351,7 +406,16 @@ class BaseVLNCETrainer(BaseILTrainer):
 
                 ep_id = current_episodes[i].episode_id
                 stats_episodes[ep_id] = infos[i]
-                observations[i] = envs.reset_at(i)[0]
+                if scheduler is None:
+                    observations[i] = envs.reset_at(i)[0]
+                else:
+                    # without a next episode the env stays on the finished
+                    # one and is paused below
+                    next_observations = self._reset_to_next_episode(
+                        envs, scheduler, i
+                    )
+                    if next_observations is not None:
+                        observations[i] = next_observations
                 prev_actions[i] = torch.zeros(1, dtype=torch.long)
 
                 if config.use_pbar:
@@ -392,6 +456,10 @@ class BaseVLNCETrainer(BaseILTrainer):
                 if next_episodes[i].episode_id in stats_episodes:
                     envs_to_pause.append(i)
 
+            if scheduler is not None:
+                for idx in reversed(envs_to_pause):
+                    scheduler.pause_at(idx)
+
             (
                 envs,
                 rnn_states,
@@ -413,6 +481,17 @@ class BaseVLNCETrainer(BaseILTrainer):
         if config.use_pbar:
             pbar.close()
 
+        if num_steps > 0:
+            logger.info(
+                "Eval batch occupancy: "
+                f"{num_active_steps / (num_steps * num_slots):.3f}"
+                + (
+                    f", episodes moved between envs: {scheduler.num_stolen}"
+                    if scheduler is not None
+                    else ""
+                )
+            )
+
         aggregated_stats = {}
         num_episodes = len(stats_episodes)
         for k in next(iter(stats_episodes.values())).keys():
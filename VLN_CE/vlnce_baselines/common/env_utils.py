@@ -1,12 +1,51 @@
+import heapq
 import random
-from typing import List, Optional, Type, Union
+from collections import Counter, deque
+from typing import Dict, List, Optional, Tuple, Type, Union
 
 import habitat
-from habitat import Config, Env, RLEnv, VectorEnv, make_dataset
+import numpy as np
+from habitat import Config, Env, RLEnv, VectorEnv, logger, make_dataset
 from habitat.core.dataset import ALL_SCENES_MASK
 from habitat_baselines.utils.env_utils import make_env_fn
 
 
+def balance_scene_splits(
+    scene_counts: Dict[str, int], num_splits: int
+) -> List[List[str]]:
+    """Assigns scenes to `num_splits` envs so that the number of episodes
+    per env is balanced: longest-processing-time-first, each scene (from
+    the most to the fewest episodes) goes to the env with the fewest
+    episodes so far. Ties keep the order of `scene_counts`.
+    """
+    scene_splits: List[List[str]] = [[] for _ in range(num_splits)]
+    loads = [(0, idx) for idx in range(num_splits)]
+    for scene in sorted(scene_counts, key=lambda s: -scene_counts[s]):
+        load, idx = heapq.heappop(loads)
+        scene_splits[idx].append(scene)
+        heapq.heappush(loads, (load + scene_counts[scene], idx))
+    return scene_splits
+
+
+def scene_split_stats(
+    scene_splits: List[List[str]], scene_counts: Dict[str, int]
+) -> Dict[str, float]:
+    """Episodes per env of a scene assignment. `imbalance` is the ratio of
+    the largest to the mean load: lockstep stepping runs at 1 / imbalance
+    of full occupancy once the other envs run out of episodes.
+    """
+    loads = np.array(
+        [sum(scene_counts.get(s, 0) for s in split) for split in scene_splits]
+    )
+    mean = loads.mean() if len(loads) else 0.0
+    return {
+        "min_episodes": int(loads.min()) if len(loads) else 0,
+        "max_episodes": int(loads.max()) if len(loads) else 0,
+        "mean_episodes": float(mean),
+        "imbalance": float(loads.max() / mean) if mean > 0 else 1.0,
+    }
+
+
 def construct_envs(
     config: Config,
     env_class: Type[Union[Env, RLEnv]],
@@ -16,7 +55,8 @@ def construct_envs(
 ) -> VectorEnv:
     """Create VectorEnv object with specified config and env class type.
     To allow better performance, dataset are split into small ones for
-    each individual env, grouped by scenes.
+    each individual env, grouped by scenes. Datasets that report episode
+    counts per scene are split with `balance_scene_splits`.
     :param config: configs that contain num_environments as well as information
     :param necessary to create individual environments.
     :param env_class: class type of the envs to be created.
@@ -39,11 +79,44 @@ def construct_envs(
         config.TASK_CONFIG.DATASET.EPISODES_ALLOWED = episodes_allowed
         config.freeze()
 
+    shard = None
+    if config.TASK_CONFIG.DATASET.get("NUM_SHARDS", 1) > 1:
+        # resolve the shard once: per-env configs only hold a subset of the
+        # scenes and would shard it again
+        shard = make_dataset(
+            config.TASK_CONFIG.DATASET.TYPE, config=config.TASK_CONFIG.DATASET
+        )
+        config.defrost()
+        config.TASK_CONFIG.DATASET.EPISODES_ALLOWED = [
+            ep.episode_id for ep in shard.episodes
+        ]
+        config.TASK_CONFIG.DATASET.NUM_SHARDS = 1
+        config.TASK_CONFIG.DATASET.SHARD_ID = 0
+        config.freeze()
+
     configs = []
     env_classes = [env_class for _ in range(num_envs)]
     dataset = make_dataset(config.TASK_CONFIG.DATASET.TYPE)
     scenes = config.TASK_CONFIG.DATASET.CONTENT_SCENES
-    if ALL_SCENES_MASK in config.TASK_CONFIG.DATASET.CONTENT_SCENES:
+    scene_counts = None
+    has_counts = shard is not None or hasattr(
+        dataset, "get_scene_episode_counts"
+    )
+    if has_counts and (num_envs > 1 or ALL_SCENES_MASK in scenes):
+        if shard is not None:
+            # the loaded shard already holds exactly the episodes to split
+            counts = Counter(
+                shard.scene_from_scene_path(ep.scene_id)
+                for ep in shard.episodes
+            )
+        else:
+            counts = dataset.get_scene_episode_counts(
+                config.TASK_CONFIG.DATASET
+            )
+        if ALL_SCENES_MASK in scenes:
+            scenes = sorted(counts)
+        scene_counts = {scene: counts.get(scene, 0) for scene in scenes}
+    elif ALL_SCENES_MASK in config.TASK_CONFIG.DATASET.CONTENT_SCENES:
         scenes = dataset.get_scenes_to_load(config.TASK_CONFIG.DATASET)
 
     if num_envs > 1:
@@ -63,6 +136,14 @@ def construct_envs(
 
     if len(scenes) == 1:
         scene_splits = [[scenes[0]] for _ in range(num_envs)]
+    elif scene_counts is not None:
+        # ties between scenes keep the shuffled order
+        scene_counts = {scene: scene_counts[scene] for scene in scenes}
+        scene_splits = balance_scene_splits(scene_counts, num_envs)
+        logger.info(
+            "Episodes per env: "
+            f"{scene_split_stats(scene_splits, scene_counts)}"
+        )
     else:
         scene_splits = [[] for _ in range(num_envs)]
         for idx, scene in enumerate(scenes):
@@ -101,3 +182,49 @@ def construct_envs_auto_reset_false(
     config: Config, env_class: Type[Union[Env, RLEnv]]
 ) -> VectorEnv:
     return construct_envs(config, env_class, auto_reset_done=False)
+
+
+class EpisodeScheduler:
+    """Hands out the episodes of a VectorEnv one at a time so that every env
+    stays busy until no episode is left. Each env runs its own episodes in
+    order; an env that has run out takes the last pending episode of the
+    env with the most episodes left. Queues are grouped by scene, so taking
+    from the back moves whole scenes between envs.
+    """
+
+    def __init__(
+        self, env_episode_ids: List[List[str]], max_episodes: int = -1
+    ) -> None:
+        self._queues = [deque(ids) for ids in env_episode_ids]
+        self.num_episodes = sum(map(len, self._queues))
+        if max_episodes > -1:
+            self.num_episodes = min(max_episodes, self.num_episodes)
+        self.num_dispatched = 0
+        self.num_stolen = 0
+
+    def next_episode(self, env_idx: int) -> Optional[Tuple[int, str]]:
+        """Returns:
+            (index of the env holding the episode, episode ID) of the next
+            episode for env `env_idx`, or None if no episode is left
+        """
+        if self.num_dispatched >= self.num_episodes:
+            return None
+
+        if self._queues[env_idx]:
+            owner = env_idx
+            episode_id = self._queues[owner].popleft()
+        else:
+            owner = max(
+                range(len(self._queues)), key=lambda j: len(self._queues[j])
+            )
+            if not self._queues[owner]:
+                return None
+            episode_id = self._queues[owner].pop()
+            self.num_stolen += 1
+
+        self.num_dispatched += 1
+        return owner, episode_id
+
+    def pause_at(self, env_idx: int) -> None:
+        """Mirrors VectorEnv.pause_at to keep env indices aligned."""
+        self._queues.pop(env_idx)
@@ -1,15 +1,23 @@
-from typing import Any, Dict, Optional, Tuple, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import habitat
 import numpy as np
 from habitat import Config, Dataset
+from habitat.core.dataset import Episode
 from habitat.core.simulator import Observations
 from habitat.tasks.utils import cartesian_to_polar
 from habitat.utils.geometry_utils import quaternion_rotate_vector
 from habitat_baselines.common.baseline_registry import baseline_registry
 
-from VLN_CE.habitat_extensions.discrete_planner import DiscretePathPlanner
-from VLN_CE.habitat_extensions.utils import  navigator_video_frame
+from VLN_CE.habitat_extensions.discrete_planner import (
+    DiscretePathPlanner,
+    LookupDiscretePathPlanner,
+)
+from VLN_CE.habitat_extensions.utils import (
+    navigator_video_frame,
+    render_observations,
+    step_without_observations,
+)
 
 
 @baseline_registry.register_env(name="VLNCEDaggerEnv")
@@ -31,6 +39,30 @@ class VLNCEDaggerEnv(habitat.RLEnv):
     def get_info(self, observations: Observations) -> Dict[Any, Any]:
         return self.habitat_env.get_metrics()
 
+    def episode_ids(self) -> List[str]:
+        """IDs of the episodes of this env, grouped by scene."""
+        return [
+            ep.episode_id
+            for ep in sorted(
+                self.episodes, key=lambda e: (e.scene_id, e.episode_id)
+            )
+        ]
+
+    def get_episode(self, episode_id: str) -> Episode:
+        return next(ep for ep in self.episodes if ep.episode_id == episode_id)
+
+    def reset_to_episode(
+        self, episode_id: str, episode: Optional[Episode] = None
+    ) -> Observations:
+        """Resets to `episode` or, if None, to the episode of this env with
+        ID `episode_id`. Episodes from other envs may be of other scenes;
+        the simulator is reconfigured on reset.
+        """
+        if episode is None:
+            episode = self.get_episode(episode_id)
+        self._env.episode_iterator = iter([episode])
+        return self.reset()
+
 
 @baseline_registry.register_env(name="VLNCEInferenceEnv")
 class VLNCEInferenceEnv(habitat.RLEnv):
@@ -99,13 +131,29 @@ class VLNCEWaypointEnvDiscretized(VLNCEWaypointEnv):
         self.video_option = config.VIDEO_OPTION
         self.video_dir = config.VIDEO_DIR
         self.video_frames = []
+        # video frames need the observations of every primitive action
+        self.skip_intermediate_observations = (
+            config.RL.SKIP_INTERMEDIATE_OBSERVATIONS and not self.video_option
+        )
 
         step_size = config.TASK_CONFIG.SIMULATOR.FORWARD_STEP_SIZE
-        self.discrete_planner = DiscretePathPlanner(
-            forward_distance=step_size,
-            turn_angle=np.deg2rad(config.TASK_CONFIG.SIMULATOR.TURN_ANGLE),
-            goal_radius=round(step_size / 2, 2) + 0.01,  # 0.13m for 0.25m step
-        )
+        planner_kwargs = {
+            "forward_distance": step_size,
+            "turn_angle": np.deg2rad(config.TASK_CONFIG.SIMULATOR.TURN_ANGLE),
+            # 0.13m for 0.25m step
+            "goal_radius": round(step_size / 2, 2) + 0.01,
+        }
+        planner_cfg = config.RL.PLANNER
+        if planner_cfg.use_lookup_table:
+            self.discrete_planner = LookupDiscretePathPlanner(
+                distance_resolution=planner_cfg.distance_resolution,
+                max_distance=planner_cfg.max_distance,
+                heading_resolution=np.deg2rad(planner_cfg.heading_resolution),
+                cache_dir=planner_cfg.cache_dir,
+                **planner_kwargs,
+            )
+        else:
+            self.discrete_planner = DiscretePathPlanner(**planner_kwargs)
         super().__init__(config, dataset)
 
     def get_reward(self, *args: Any, **kwargs: Any) -> float:
@@ -149,7 +197,14 @@ class VLNCEWaypointEnvDiscretized(VLNCEWaypointEnv):
                     agent_state.position, agent_state.rotation
                 )
 
-            for discrete_action in plan:
+            for i, discrete_action in enumerate(plan):
+                if self.skip_intermediate_observations and i < len(plan) - 1:
+                    step_without_observations(self._env, discrete_action)
+                    if self._env.episode_over:
+                        observations = render_observations(self._env)
+                        break
+                    continue
+
                 observations = self._env.step(discrete_action, *args, **kwargs)
                 if self.video_option:
                     info = self.get_info(observations)
@@ -1,11 +1,17 @@
+import argparse
 import gzip
 import json
+import math
+import random
+import time
 from collections import defaultdict, deque
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import torch
 import tqdm
 from gym import Space
+from habitat import logger
 from habitat.config.default import Config
 from habitat.sims.habitat_simulator.actions import HabitatSimActions
 from habitat_baselines.common.environments import get_env_class
@@ -14,11 +20,101 @@ from habitat_baselines.common.obs_transformers import (
     get_active_obs_transforms,
 )
 
+from habitat_extensions.episode_store import shard_slice
+from habitat_extensions.gt_index import load_gt_path_index
 from habitat_extensions.task import ALL_ROLES_MASK, RxRVLNCEDatasetV1
 from vlnce_baselines.common.env_utils import construct_envs
 from vlnce_baselines.common.utils import extract_instruction_tokens
 
 
+def episode_to_tensors(obs_t, prev_actions, oracle_actions, inflec_weights):
+    """Converts one transposed episode {key: [T, ...]} to the training tuple
+    (observations, prev_actions, oracle_actions, inflection weights).
+    Tensors and arrays are shared, not copied.
+    """
+    obs_t = {k: torch.as_tensor(v) for k, v in obs_t.items()}
+    prev_actions = torch.as_tensor(prev_actions)
+    oracle_actions = torch.as_tensor(oracle_actions)
+
+    inflections = torch.cat(
+        [
+            torch.tensor([1], dtype=torch.long),
+            (oracle_actions[1:] != oracle_actions[:-1]).long(),
+        ]
+    )
+
+    return (
+        obs_t,
+        prev_actions,
+        oracle_actions,
+        inflec_weights[inflections],
+    )
+
+
+class EpisodeBuffer:
+    """Tensors for up to max_steps steps of an episode, allocated on the
+    first observation and filled in place as the episode is simulated. A
+    completed episode is already transposed to {key: [T, ...]}, so batching
+    it needs no further copies. reset() empties the buffer for the next
+    episode without reallocating.
+    """
+
+    def __init__(self, max_steps: int, pin_memory: bool = False) -> None:
+        self.max_steps = max_steps
+        self.pin_memory = pin_memory
+        self.observations: Dict[str, torch.Tensor] = {}
+        self.prev_actions = self._empty(max_steps, dtype=torch.long)
+        self.oracle_actions = self._empty(max_steps, dtype=torch.long)
+        # numpy views of the tensors above, written to by append
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._step = 0
+
+    def __len__(self) -> int:
+        return self._step
+
+    def _empty(self, *shape: int, dtype: torch.dtype) -> torch.Tensor:
+        return torch.empty(shape, dtype=dtype, pin_memory=self.pin_memory)
+
+    def reset(self) -> None:
+        self._step = 0
+
+    def append(
+        self,
+        observations: Dict[str, Any],
+        prev_action: int,
+        oracle_action: int,
+    ) -> None:
+        assert (
+            self._step < self.max_steps
+        ), "Episode is longer than the buffer."
+        for k, v in observations.items():
+            v = np.asarray(v)
+            if k not in self._arrays:
+                dtype = torch.from_numpy(np.empty(0, dtype=v.dtype)).dtype
+                self.observations[k] = self._empty(
+                    self.max_steps, *v.shape, dtype=dtype
+                )
+                self._arrays[k] = self.observations[k].numpy()
+            self._arrays[k][self._step] = v
+
+        self.prev_actions[self._step] = prev_action
+        self.oracle_actions[self._step] = oracle_action
+        self._step += 1
+
+    def episode(
+        self,
+    ) -> Tuple[Dict[str, torch.Tensor], torch.Tensor, torch.Tensor]:
+        """(observations, prev_actions, oracle_actions) of the steps
+        appended so far, as views of the buffer.
+        """
+        steps = slice(0, self._step)
+        return (
+            {k: v[steps] for k, v in self.observations.items()},
+            self.prev_actions[steps],
+            self.oracle_actions[steps],
+        )
+
+
 class TeacherRecollectionDataset(torch.utils.data.IterableDataset):
     def __init__(self, config: Config):
         super().__init__()
@@ -30,6 +126,24 @@ class TeacherRecollectionDataset(torch.utils.data.IterableDataset):
         ), "preload size must be greater than batch size."
         self.envs = None
         self._env_observations = None
+        # free episode buffers, and those handed out by the last
+        # batch_size calls to __next__ that the consumer may still read
+        self._buffer_pool: List[EpisodeBuffer] = []
+        self._in_flight = deque()
+        self._observation_space = None
+        self._action_space = None
+        self.num_workers = config.IL.RECOLLECT_TRAINER.num_workers
+        self.preload_size = config.IL.RECOLLECT_TRAINER.preload_size
+        self.bucket_by_length = config.IL.RECOLLECT_TRAINER.bucket_by_length
+        # completed episodes left over from the last batch bucketing, those
+        # completed past the end of the current epoch and the number of
+        # episodes the current epoch still has to collect
+        self._reservoir = []
+        self._carry = []
+        self._epoch_remaining = 0
+        # [steps, padded steps, padded steps without bucketing] of the
+        # emitted batches
+        self._padding_counts = [0, 0, 0]
 
         if config.IL.use_iw:
             self.inflec_weights = torch.tensor(
@@ -45,60 +159,152 @@ class TeacherRecollectionDataset(torch.utils.data.IterableDataset):
                 self.trajectories = json.load(f)
         else:
             self.trajectories = self.collect_dataset()
+        self._max_traj_steps = max(len(t) for t in self.trajectories.values())
 
-        self.initialize_sims()
-
-    def initialize_sims(self):
+        if self.num_workers > 0:
+            # DataLoader workers construct their own envs in __iter__. The
+            # main process only needs the spaces and the dataset length.
+            self.initialize_sims(num_environments=1)
+            self.close_sims()
+        else:
+            self.initialize_sims()
+
+    def initialize_sims(
+        self,
+        episodes_allowed: Optional[List[str]] = None,
+        num_environments: Optional[int] = None,
+        seed_offset: int = 0,
+    ):
         config = self.config.clone()
         config.defrost()
         config.TASK_CONFIG.MEASUREMENTS = []
+        config.TASK_CONFIG.SEED += seed_offset
+        if num_environments is not None:
+            config.NUM_ENVIRONMENTS = num_environments
         config.freeze()
 
+        if episodes_allowed is None:
+            episodes_allowed = list(self.trajectories.keys())
+
         self.envs = construct_envs(
             config,
             get_env_class(config.ENV_NAME),
-            episodes_allowed=list(self.trajectories.keys()),
+            episodes_allowed=episodes_allowed,
         )
         self.length = sum(self.envs.number_of_episodes)
         self.obs_transforms = get_active_obs_transforms(self.config)
         self._observation_space = apply_obs_transforms_obs_space(
             self.envs.observation_spaces[0], self.obs_transforms
         )
-
+        self._action_space = self.envs.action_spaces[0]
+
+        # pin episode buffers only when the trainer consumes them directly;
+        # DataLoader workers hand batches to the loader's own pinning.
+        self._pin_buffers = (
+            self.config.IL.RECOLLECT_TRAINER.pin_memory
+            and torch.utils.data.get_worker_info() is None
+            and torch.cuda.is_available()
+        )
         self.env_step = [0 for _ in range(self.envs.num_envs)]
-        self._env_observations = [[] for _ in range(self.envs.num_envs)]
 
         observations = self.envs.reset()
         observations = extract_instruction_tokens(
             observations,
             self.config.TASK_CONFIG.TASK.INSTRUCTION_SENSOR_UUID,
         )
+        self._buffer_pool = []
+        self._env_observations = []
         for i, ep in enumerate(self.envs.current_episodes()):
+            self._env_observations.append(self._episode_buffer())
             path_step = self.trajectories[ep.episode_id][0]
             self._env_observations[i].append(
-                (
-                    observations[i],
-                    path_step[0],  # prev_action
-                    path_step[2],  # oracle_action
-                )
+                observations[i],
+                path_step[0],  # prev_action
+                path_step[2],  # oracle_action
             )
 
+    def _episode_buffer(self) -> EpisodeBuffer:
+        """An empty buffer from the pool. Buffers fit the longest
+        trajectory, so any of them can hold the next episode of any env.
+        """
+        if self._buffer_pool:
+            buffer = self._buffer_pool.pop()
+            buffer.reset()
+            return buffer
+        return EpisodeBuffer(self._max_traj_steps, self._pin_buffers)
+
+    def initialize_worker_sims(self, worker_id: int, num_workers: int):
+        """Constructs the envs of one DataLoader worker. Workers own
+        deterministic contiguous chunks of the sorted episode IDs and split
+        the envs and the preload budget evenly.
+        """
+        episode_ids = sorted(self.trajectories.keys())
+        episodes_allowed = episode_ids[
+            shard_slice(len(episode_ids), num_workers, worker_id)
+        ]
+        self.preload_size = max(
+            self.batch_size,
+            math.ceil(
+                self.config.IL.RECOLLECT_TRAINER.preload_size / num_workers
+            ),
+        )
+        self.initialize_sims(
+            episodes_allowed=episodes_allowed,
+            num_environments=max(
+                1, self.config.NUM_ENVIRONMENTS // num_workers
+            ),
+            seed_offset=worker_id * self.config.NUM_ENVIRONMENTS,
+        )
+
     @property
     def batch_size(self):
         return self.config.IL.batch_size
 
+    @property
+    def loader_kwargs(self) -> Dict[str, Any]:
+        """torch.utils.data.DataLoader arguments matching the worker and
+        memory settings of this dataset. Memory is only pinned with CUDA.
+        """
+        return {
+            "batch_size": self.batch_size,
+            "num_workers": self.num_workers,
+            "pin_memory": (
+                self.config.IL.RECOLLECT_TRAINER.pin_memory
+                and torch.cuda.is_available()
+            ),
+            # bucketed epochs end in a partial batch
+            "drop_last": not self.bucket_by_length,
+        }
+
     @property
     def observation_space(self) -> Space:
-        assert self.envs is not None, "Simulator must first be loaded."
-        assert self._observation_space is not None
+        assert (
+            self._observation_space is not None
+        ), "Simulator must first be loaded."
         return self._observation_space
 
     @property
     def action_space(self) -> Space:
-        assert self.envs is not None, "Simulator must first be loaded."
-        return self.envs.action_spaces[0]
+        assert (
+            self._action_space is not None
+        ), "Simulator must first be loaded."
+        return self._action_space
+
+    def padding_stats(self) -> Dict[str, float]:
+        """Fraction of padded steps in the batches emitted so far, with and
+        without length bucketing.
+        """
+        steps, padded, unbucketed = self._padding_counts
+        return {
+            "padding_fraction": 1 - steps / padded if padded else 0.0,
+            "unbucketed_padding_fraction": (
+                1 - steps / unbucketed if unbucketed else 0.0
+            ),
+        }
 
     def close_sims(self):
+        if self._padding_counts[0]:
+            logger.info(f"Recollection batch padding: {self.padding_stats()}")
         self.envs.close()
         del self.envs
         del self._env_observations
@@ -111,44 +317,49 @@ class TeacherRecollectionDataset(torch.utils.data.IterableDataset):
         """
         trajectories = defaultdict(list)
         split = self.config.TASK_CONFIG.DATASET.SPLIT
-
-        if "{role}" in self.config.IL.RECOLLECT_TRAINER.gt_file:
+        gt_file = self.config.IL.RECOLLECT_TRAINER.gt_file
+
+        if "{role}" in gt_file:
+            gt_files = [
+                gt_file.format(split=split, role=role)
+                for role in RxRVLNCEDatasetV1.annotation_roles
+                if ALL_ROLES_MASK in self.config.TASK_CONFIG.DATASET.ROLES
+                or role in self.config.TASK_CONFIG.DATASET.ROLES
+            ]
+        else:
+            gt_files = [gt_file.format(split=split)]
+
+        # prefer the shared memory-mapped index (see gt_index.py)
+        gt_index = load_gt_path_index(gt_files)
+        if gt_index is not None:
+            gt_actions = (
+                (ep_id, gt_index.actions(ep_id).tolist())
+                for ep_id in gt_index.episode_ids()
+            )
+            num_episodes = len(gt_index)
+        else:
             gt_data = {}
-            for role in RxRVLNCEDatasetV1.annotation_roles:
-                if (
-                    ALL_ROLES_MASK not in self.config.TASK_CONFIG.DATASET.ROLES
-                    and role not in self.config.TASK_CONFIG.DATASET.ROLES
-                ):
-                    continue
-
-                with gzip.open(
-                    self.config.IL.RECOLLECT_TRAINER.gt_file.format(
-                        split=split, role=role
-                    ),
-                    "rt",
-                ) as f:
+            for f_name in gt_files:
+                with gzip.open(f_name, "rt") as f:
                     gt_data.update(json.load(f))
-        else:
-            with gzip.open(
-                self.config.IL.RECOLLECT_TRAINER.gt_path.format(split=split)
-            ) as f:
-                gt_data = json.load(f)
+            gt_actions = ((k, v["actions"]) for k, v in gt_data.items())
+            num_episodes = len(gt_data)
 
         t = (
-            tqdm.tqdm(gt_data.items(), "GT Collection")
+            tqdm.tqdm(gt_actions, "GT Collection", total=num_episodes)
             if self.config.use_pbar
-            else gt_data.items()
+            else gt_actions
         )
 
-        for episode_id, trajectory in t:
+        for episode_id, gt_episode_actions in t:
             if (
                 self.config.IL.RECOLLECT_TRAINER.max_traj_len != -1
-                and len(trajectory["actions"])
+                and len(gt_episode_actions)
                 > self.config.IL.RECOLLECT_TRAINER.max_traj_len
             ):
                 continue
 
-            for i, action in enumerate(trajectory["actions"]):
+            for i, action in enumerate(gt_episode_actions):
                 prev_action = (
                     trajectories[episode_id][i - 1][1]
                     if i
@@ -164,109 +375,231 @@ class TeacherRecollectionDataset(torch.utils.data.IterableDataset):
             f.write(json.dumps(trajectories))
         return trajectories
 
-    def _load_next(self):
-        """
-        Episode length is currently not considered. We were previously batching episodes
-        together with similar lengths. Not sure if we need to bring that back.
+    def _step_envs(self):
+        """Steps every env along its trajectory once.
+        Returns:
+            the buffers of the episodes completed by this step
         """
+        completed = []
+        prev_eps = self.envs.current_episodes()
 
-        if len(self._preload):
-            return self._preload.popleft()
+        # get the next action for each env
+        actions = [
+            self.trajectories[ep.episode_id][self.env_step[i]][1]
+            for i, ep in enumerate(prev_eps)
+        ]
 
-        while (
-            len(self._preload) < self.config.IL.RECOLLECT_TRAINER.preload_size
-        ):
-            current_episodes = self.envs.current_episodes()
-            prev_eps = current_episodes
+        outputs = self.envs.step(actions)
+        observations, _, dones, _ = [list(x) for x in zip(*outputs)]
+        observations = extract_instruction_tokens(
+            observations,
+            self.config.TASK_CONFIG.TASK.INSTRUCTION_SENSOR_UUID,
+        )
 
-            # get the next action for each env
-            actions = [
-                self.trajectories[ep.episode_id][self.env_step[i]][1]
-                for i, ep in enumerate(current_episodes)
-            ]
+        current_episodes = self.envs.current_episodes()
 
-            outputs = self.envs.step(actions)
-            observations, _, dones, _ = [list(x) for x in zip(*outputs)]
-            observations = extract_instruction_tokens(
-                observations,
-                self.config.TASK_CONFIG.TASK.INSTRUCTION_SENSOR_UUID,
+        for i in range(self.envs.num_envs):
+            self.env_step[i] += 1
+            if dones[i]:
+                assert len(self._env_observations[i]) == len(
+                    self.trajectories[prev_eps[i].episode_id]
+                ), "Collected episode does not match the step count of trajectory"
+                completed.append(self._env_observations[i])
+                self._env_observations[i] = self._episode_buffer()
+                self.env_step[i] = 0
+
+            path_step = self.trajectories[current_episodes[i].episode_id][
+                self.env_step[i]
+            ]
+            self._env_observations[i].append(
+                observations[i],
+                path_step[0],  # prev_action
+                path_step[2],  # oracle_action
             )
+            assert (
+                len(self._env_observations[i])
+                <= self.config.TASK_CONFIG.ENVIRONMENT.MAX_EPISODE_STEPS
+            ), "Trajectories should be no more than the maximum episode steps."
 
-            current_episodes = self.envs.current_episodes()
-
-            for i in range(self.envs.num_envs):
-                self.env_step[i] += 1
-                if dones[i]:
-                    assert len(self._env_observations[i]) == len(
-                        self.trajectories[prev_eps[i].episode_id]
-                    ), "Collected episode does not match the step count of trajectory"
-                    self._preload.append(
-                        (
-                            [o[0] for o in self._env_observations[i]],
-                            [o[1] for o in self._env_observations[i]],
-                            [o[2] for o in self._env_observations[i]],
-                        )
-                    )
-                    self._env_observations[i] = []
-                    self.env_step[i] = 0
-
-                path_step = self.trajectories[current_episodes[i].episode_id][
-                    self.env_step[i]
-                ]
-                self._env_observations[i].append(
-                    (
-                        observations[i],
-                        path_step[0],  # prev_action
-                        path_step[2],  # oracle_action
-                    )
-                )
-                assert (
-                    len(self._env_observations[i])
-                    <= self.config.TASK_CONFIG.ENVIRONMENT.MAX_EPISODE_STEPS
-                ), "Trajectories should be no more than the maximum episode steps."
+        return completed
+
+    def _load_next(self):
+        """Returns the next completed episode, in the order the envs complete
+        them unless IL.RECOLLECT_TRAINER.bucket_by_length is set (see
+        _load_bucketed).
+        """
+        if len(self._preload):
+            return self._preload.popleft()
+
+        if self.bucket_by_length:
+            self._load_bucketed()
+        else:
+            while len(self._preload) < self.preload_size:
+                self._preload.extend(self._step_envs())
 
         return self._preload.popleft()
 
+    def _load_bucketed(self):
+        """Gathers completed episodes in a reservoir of preload_size, sorts
+        them by length and queues them as batches in random order, so that
+        consecutive batch_size episodes need less padding. Episodes of an
+        incomplete last batch stay in the reservoir to keep batch boundaries
+        aligned with the DataLoader's. An epoch holds self.length episodes;
+        its last reservoir is flushed entirely, ending in a partial batch,
+        and the iteration stops once it has been emitted.
+        """
+        reservoir = self._reservoir
+        while len(reservoir) < self.preload_size and self._epoch_remaining:
+            episodes = self._step_envs()
+            # episodes completed past the end of the epoch open the next one
+            self._carry.extend(episodes[self._epoch_remaining :])
+            episodes = episodes[: self._epoch_remaining]
+            self._epoch_remaining -= len(episodes)
+            reservoir.extend(episodes)
+
+        if not reservoir:
+            raise StopIteration
+
+        num_emitted = len(reservoir)
+        if self._epoch_remaining:
+            num_emitted -= num_emitted % self.batch_size
+        self._reservoir = reservoir[num_emitted:]
+        reservoir = reservoir[:num_emitted]
+
+        unbucketed_batches = self._batches(reservoir)
+        reservoir.sort(key=len)
+        batches = self._batches(reservoir)
+        random.shuffle(batches)
+
+        for batch, unbucketed_batch in zip(batches, unbucketed_batches):
+            self._padding_counts[0] += sum(len(ep) for ep in batch)
+            self._padding_counts[1] += len(batch) * max(map(len, batch))
+            self._padding_counts[2] += len(unbucketed_batch) * max(
+                map(len, unbucketed_batch)
+            )
+            self._preload.extend(batch)
+
+    def _batches(self, episodes: List[Any]) -> List[List[Any]]:
+        return [
+            episodes[i : i + self.batch_size]
+            for i in range(0, len(episodes), self.batch_size)
+        ]
+
     def __next__(self):
         """Takes about 1s to once self._load_next() has finished with a batch
-        size of 5. For this reason, we probably don't need to use extra workers.
+        size of 5. With IL.RECOLLECT_TRAINER.num_workers > 0, DataLoader
+        workers simulate in parallel with training.
         """
-        x = self._load_next()
-        obs, prev_actions, oracle_actions = x
+        buffer = self._load_next()
+        # A DataLoader collates each batch_size episodes into new tensors
+        # before fetching the next ones, so buffers handed out more than
+        # batch_size episodes ago can be refilled.
+        self._in_flight.append(buffer)
+        while len(self._in_flight) > self.batch_size:
+            self._buffer_pool.append(self._in_flight.popleft())
 
-        # transpose obs
-        obs_t = defaultdict(list)
-        for k in obs[0]:
-            for i in range(len(obs)):
-                obs_t[k].append(obs[i][k])
+        return episode_to_tensors(*buffer.episode(), self.inflec_weights)
 
-            obs_t[k] = np.array(obs_t[k])
+    def __iter__(self):
+        worker_info = torch.utils.data.get_worker_info()
+        if self.envs is None:
+            if worker_info is None:
+                self.initialize_sims()
+            else:
+                self.initialize_worker_sims(
+                    worker_info.id, worker_info.num_workers
+                )
 
-        for k, v in obs_t.items():
-            obs_t[k] = torch.from_numpy(np.copy(v))
+        if self.bucket_by_length:
+            self._reservoir.extend(self._carry)
+            self._epoch_remaining = max(
+                0, self.length - len(self._reservoir) - len(self._preload)
+            )
+            self._carry = []
 
-        prev_actions = torch.from_numpy(np.copy(prev_actions))
-        oracle_actions = torch.from_numpy(np.copy(oracle_actions))
+        return self
 
-        inflections = torch.cat(
-            [
-                torch.tensor([1], dtype=torch.long),
-                (oracle_actions[1:] != oracle_actions[:-1]).long(),
-            ]
-        )
 
-        return (
-            obs_t,
-            prev_actions,
-            oracle_actions,
-            self.inflec_weights[inflections],
+def benchmark_batch_assembly(
+    num_episodes: int = 20,
+    num_steps: int = 60,
+    rgb_shape: Tuple[int, ...] = (224, 224, 3),
+    depth_shape: Tuple[int, ...] = (256, 256, 1),
+    pin_memory: bool = False,
+) -> Dict[str, float]:
+    """Times turning simulated steps into episode tensors, either by
+    transposing per-step observation dicts (the former __next__) or by
+    refilling a pooled EpisodeBuffer as the steps arrive. With pin_memory
+    (and CUDA), both produce page-locked tensors: the transposed episode
+    is copied to pinned memory as a DataLoader would, the buffer is pinned
+    once when allocated.
+    Returns:
+        seconds per episode of both methods and an estimate of the bytes
+        each copies per episode, counted from the copies it makes
+    """
+    pin_memory = pin_memory and torch.cuda.is_available()
+    rng = np.random.default_rng(0)
+    steps = [
+        {
+            "rgb": rng.integers(0, 255, rgb_shape, dtype=np.uint8),
+            "depth": rng.random(depth_shape, dtype=np.float32),
+            "instruction": np.zeros(200, dtype=np.int64),
+        }
+        for _ in range(num_steps)
+    ]
+    episode_bytes = num_steps * sum(v.nbytes for v in steps[0].values())
+
+    start = time.perf_counter()
+    for _ in range(num_episodes):
+        obs_t = {
+            k: torch.from_numpy(np.copy(np.array([o[k] for o in steps])))
+            for k in steps[0]
+        }
+        if pin_memory:
+            obs_t = {k: v.pin_memory() for k, v in obs_t.items()}
+    transpose_time = (time.perf_counter() - start) / num_episodes
+
+    buffer = EpisodeBuffer(num_steps, pin_memory)
+    start = time.perf_counter()
+    for _ in range(num_episodes):
+        buffer.reset()
+        for o in steps:
+            buffer.append(o, 0, 0)
+        obs_t = buffer.episode()[0]
+    buffer_time = (time.perf_counter() - start) / num_episodes
+
+    return {
+        "transpose_s": transpose_time,
+        "buffer_s": buffer_time,
+        # stacking, np.copy and pinning each copy the episode once
+        "transpose_bytes_estimate": (2 + pin_memory) * episode_bytes,
+        "buffer_bytes_estimate": episode_bytes,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark episode batch assembly."
+    )
+    parser.add_argument("--num-episodes", type=int, default=20)
+    parser.add_argument("--num-steps", type=int, default=60)
+    parser.add_argument(
+        "--pin-memory",
+        action="store_true",
+        help="produce page-locked tensors (requires CUDA)",
+    )
+    args = parser.parse_args()
+
+    stats = benchmark_batch_assembly(
+        args.num_episodes, args.num_steps, pin_memory=args.pin_memory
+    )
+    for method in ["transpose", "buffer"]:
+        print(
+            f"{method}: {stats[f'{method}_s'] * 1000:.1f} ms/episode, "
+            f"~{stats[f'{method}_bytes_estimate'] / 2 ** 20:.1f} MiB "
+            "copied/episode (estimated)"
         )
 
-    def __iter__(self):
-        worker_info = torch.utils.data.get_worker_info()
-        if worker_info is not None:
-            assert (
-                worker_info.num_workers == 1
-            ), "multiple workers not supported."
 
-        return self
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,41 @@
 from collections import defaultdict
 from typing import DefaultDict, Dict, Iterator, Tuple
 
+import numpy as np
 import torch
-from gym import Space
+from gym import Space, spaces
 from habitat.core.simulator import Observations
 from habitat_baselines.common.rollout_storage import RolloutStorage
 from torch import Tensor
 
 
+def storage_dtype(space: Space) -> torch.dtype:
+    """The narrowest dtype that holds every value of `space` exactly. The
+    values of Discrete and integer Box spaces lie within the space bounds,
+    so they get the smallest integer type covering them (uint8 for RGB).
+    Float spaces have no lossless narrower type and stay float32.
+    """
+    if isinstance(space, spaces.Discrete):
+        low, high = 0, space.n - 1
+    elif np.dtype(space.dtype) == np.bool_:
+        return torch.bool
+    elif np.issubdtype(space.dtype, np.integer):
+        low, high = np.min(space.low), np.max(space.high)
+    else:
+        return torch.float32
+
+    for dtype in [np.uint8, np.int16, np.int32, np.int64]:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return torch.from_numpy(np.zeros(0, dtype=dtype)).dtype
+    return torch.float32
+
+
 class ActionDictRolloutStorage(RolloutStorage):
     """A RolloutStorage container for actions consisting of pano, offset, and
-    distance components.
+    distance components. With `compact_observations`, observations are
+    stored in their `storage_dtype` and converted to float32 per minibatch.
+    Inserting a value that the compact dtype cannot represent raises.
     """
 
     def __init__(
@@ -22,14 +47,18 @@ class ActionDictRolloutStorage(RolloutStorage):
         num_recurrent_layers: int = 1,
         continuous_offset: bool = True,
         continuous_distance: bool = True,
+        compact_observations: bool = False,
     ) -> None:
         self.observations = {}
 
-        for sensor in observation_space.spaces:
+        for sensor, space in observation_space.spaces.items():
             self.observations[sensor] = torch.zeros(
                 num_steps + 1,
                 num_envs,
-                *observation_space.spaces[sensor].shape,
+                *space.shape,
+                dtype=storage_dtype(space)
+                if compact_observations
+                else torch.float32,
             )
 
         self.recurrent_hidden_states = torch.zeros(
@@ -82,6 +111,23 @@ class ActionDictRolloutStorage(RolloutStorage):
         self.action_log_probs = self.action_log_probs.to(device)
         self.masks = self.masks.to(device)
 
+    def get_observations(self, step: int) -> Dict[str, Tensor]:
+        """The float32 observations of all envs at `step`."""
+        return {
+            sensor: observations[step].float()
+            for sensor, observations in self.observations.items()
+        }
+
+    def _check_lossless(self, sensor: str, value: Tensor) -> None:
+        dtype = self.observations[sensor].dtype
+        if dtype.is_floating_point or value.dtype == dtype:
+            return
+        if not torch.equal(value.to(dtype).to(value.dtype), value):
+            raise ValueError(
+                f"Observations of {sensor} do not fit its {dtype} storage."
+                " Its observation space bounds are too narrow."
+            )
+
     def insert(
         self,
         observations: Observations,
@@ -93,6 +139,7 @@ class ActionDictRolloutStorage(RolloutStorage):
         masks: Tensor,
     ) -> None:
         for sensor in observations:
+            self._check_lossless(sensor, observations[sensor])
             self.observations[sensor][self.step + 1].copy_(
                 observations[sensor]
             )
@@ -243,11 +290,12 @@ class ActionDictRolloutStorage(RolloutStorage):
                 recurrent_hidden_states_batch, 0
             )
 
-            # Flatten the (T, N, ...) tensors to (T * N, ...)
+            # Flatten the (T, N, ...) tensors to (T * N, ...) and convert
+            # compactly stored observations to float32
             for sensor in observations_batch:
                 observations_batch[sensor] = self._flatten_helper(
                     T, N, observations_batch[sensor]
-                )
+                ).float()
 
             for k in self.actions:
                 actions_batch[k] = self._flatten_helper(T, N, actions_batch[k])
@@ -34,9 +34,29 @@ _C.EVAL.EPISODE_COUNT = -1
 _C.EVAL.LANGUAGES = ["en-US", "en-IN"]
 _C.EVAL.SAMPLE = False
 _C.EVAL.SAVE_RESULTS = True
+# refill the env of a finished episode with any unevaluated episode instead
+# of pausing it once its own episodes are done. Only applies to
+# VLNCEDaggerEnv and its subclasses.
+_C.EVAL.REFILL_EPISODES = False
 _C.EVAL.EVAL_NONLEARNING = False
 _C.EVAL.NONLEARNING = CN()
 _C.EVAL.NONLEARNING.AGENT = "RandomAgent"
+# options: "default", "throughput". The throughput profile strips all
+# visualization work (map measures, frame composition, GIF writing and
+# verbose printing) for headless evaluation.
+_C.EVAL.PROFILE = "default"
+# NaVid macro-action execution: the primitives queued from one model decision
+# (e.g. "move forward 75 cm" -> 3x MOVE_FORWARD) are executed back to back
+# and only the last one renders observations. With FRAME_STRIDE > 0 every
+# FRAME_STRIDE-th intermediate frame is also rendered and added to the
+# vision history. NaVid was trained on one history frame per primitive:
+# HISTORY_LAYOUT "per_primitive" keeps that layout by repeating the last
+# rendered frame for every skipped primitive, "observed" only feeds the
+# rendered frames and so also saves history tokens.
+_C.EVAL.MACRO_ACTION = CN()
+_C.EVAL.MACRO_ACTION.ENABLED = False
+_C.EVAL.MACRO_ACTION.FRAME_STRIDE = 0
+_C.EVAL.MACRO_ACTION.HISTORY_LAYOUT = "per_primitive"
 
 # ----------------------------------------------------------------------------
 # INFERENCE CONFIG
@@ -87,6 +107,16 @@ _C.IL.RECOLLECT_TRAINER.max_traj_len = -1
 # batch size.
 _C.IL.RECOLLECT_TRAINER.effective_batch_size = -1
 _C.IL.RECOLLECT_TRAINER.preload_size = 30
+# DataLoader workers for TeacherRecollectionDataset. Each worker simulates a
+# deterministic shard of the episodes with NUM_ENVIRONMENTS // num_workers
+# envs and preload_size / num_workers episodes. 0 simulates in the trainer.
+_C.IL.RECOLLECT_TRAINER.num_workers = 0
+# page-locked batches for faster host to GPU copies; ignored without CUDA
+_C.IL.RECOLLECT_TRAINER.pin_memory = False
+# group episodes of similar length into the same batch to reduce padding.
+# Batches are drawn from a reservoir of preload_size episodes in random order.
+# Iteration then stops after an epoch of episodes, ending in a partial batch.
+_C.IL.RECOLLECT_TRAINER.bucket_by_length = False
 _C.IL.RECOLLECT_TRAINER.gt_file = (
     "data/datasets/RxR_VLNCE_v0/{split}/{split}_{role}_gt.json.gz"
 )
@@ -122,6 +152,10 @@ _C.IL.DAGGER.drop_existing_lmdb_features = True
 _C.RL = CN()
 _C.RL.REWARD_MEASURE = "waypoint_reward_measure"
 _C.RL.SUCCESS_MEASURE = "success"
+# VLNCEWaypointEnvDiscretized: move through all but the last primitive
+# action of a waypoint plan without rendering sensors. Measures are still
+# updated per primitive. Ignored with video.
+_C.RL.SKIP_INTERMEDIATE_OBSERVATIONS = False
 _C.RL.NUM_UPDATES = 200000
 _C.RL.LOG_INTERVAL = 10
 _C.RL.CHECKPOINT_INTERVAL = 250
@@ -209,6 +243,20 @@ _C.RL.DDPPO.reset_critic = True
 _C.RL.DDPPO.start_from_requeue = False
 _C.RL.DDPPO.requeue_path = "data/interrupted_state.pth"
 # ----------------------------------------------------------------------------
+# DISCRETE PATH PLANNER (VLNCEWaypointEnvDiscretized)
+# ----------------------------------------------------------------------------
+_C.RL.PLANNER = CN()
+# serve plans of waypoints on an (r, theta) grid from a precomputed table.
+# off-grid waypoints are planned exactly. Continuous waypoint predictions
+# (MODEL.WAYPOINT.continuous_distance/offset) rarely hit the grid, so the
+# table is opt-in for discrete predictions that align with it.
+_C.RL.PLANNER.use_lookup_table = False
+_C.RL.PLANNER.distance_resolution = 0.05  # meters
+_C.RL.PLANNER.max_distance = 3.0  # meters
+_C.RL.PLANNER.heading_resolution = 5.0  # degrees
+# tables are cached here per planner configuration. empty disables caching.
+_C.RL.PLANNER.cache_dir = "data/planner_cache"
+# ----------------------------------------------------------------------------
 # MODELING CONFIG
 # ----------------------------------------------------------------------------
 _C.MODEL = CN()
@@ -235,6 +283,10 @@ _C.MODEL.INSTRUCTION_ENCODER.hidden_size = 128
 _C.MODEL.INSTRUCTION_ENCODER.rnn_type = "LSTM"
 _C.MODEL.INSTRUCTION_ENCODER.final_state_only = True
 _C.MODEL.INSTRUCTION_ENCODER.bidirectional = False
+# reuse each env's instruction encoding across the steps of an episode when
+# acting without gradients (evaluation, inference and DAgger collection).
+# Off by default so that existing and checkpoint configs keep re-encoding.
+_C.MODEL.INSTRUCTION_ENCODER.cache_rollout_encodings = False
 
 _C.MODEL.RGB_ENCODER = CN()
 _C.MODEL.RGB_ENCODER.cnn_type = "TorchVisionResNet50"
@@ -285,6 +337,11 @@ _C.MODEL.WAYPOINT.discrete_offsets = 7
 _C.MODEL.WAYPOINT.offset_temperature = 1.0
 
 
+EVAL_PROFILES = ["default", "throughput"]
+# measures that only exist to render top-down maps
+MAP_MEASUREMENTS = ["TOP_DOWN_MAP_VLNCE", "TOP_DOWN_MAP"]
+
+
 def purge_keys(config: CN, keys: List[str]) -> None:
     for k in keys:
         del config[k]
@@ -330,10 +387,36 @@ def get_config(
         config.CMD_TRAILING_OPTS = opts
         config.merge_from_list(opts)
 
+    apply_eval_profile(config)
+
     config.freeze()
     return config
 
 
+def apply_eval_profile(config: CN) -> CN:
+    """Applies the evaluation profile selected by `EVAL.PROFILE`. The
+    "throughput" profile removes map measures from the task and disables
+    video generation so that no visualization work is done per step.
+    """
+    assert (
+        config.EVAL.PROFILE in EVAL_PROFILES
+    ), f"EVAL.PROFILE must be one of {EVAL_PROFILES}"
+    if config.EVAL.PROFILE != "throughput":
+        return config
+
+    is_frozen = config.is_frozen()
+    config.defrost()
+    config.TASK_CONFIG.TASK.MEASUREMENTS = [
+        m
+        for m in config.TASK_CONFIG.TASK.MEASUREMENTS
+        if m not in MAP_MEASUREMENTS
+    ]
+    config.VIDEO_OPTION = []
+    if is_frozen:
+        config.freeze()
+    return config
+
+
 def add_pano_sensors_to_config(config: CN) -> CN:
     """Dynamically adds RGB and Depth cameras to config.TASK_CONFIG, forming
     an N-frame panorama. The PanoRGB and PanoDepth observation transformers
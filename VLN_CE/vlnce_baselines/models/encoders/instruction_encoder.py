@@ -1,6 +1,10 @@
+import argparse
 import gzip
 import json
+import os
+from typing import Dict, Optional, Tuple
 
+import numpy as np
 import torch
 import torch.nn as nn
 from habitat import Config
@@ -8,6 +12,47 @@ from habitat.core.simulator import Observations
 from torch import Tensor
 
 
+def embeddings_npy_path(embedding_file: str) -> str:
+    """data/.../embeddings.json.gz -> data/.../embeddings.npy"""
+    for ext in [".json.gz", ".json"]:
+        if embedding_file.endswith(ext):
+            return embedding_file[: -len(ext)] + ".npy"
+    return embedding_file + ".npy"
+
+
+def convert_embeddings(embedding_file: str) -> str:
+    """Writes the gzipped JSON word embeddings as a float32 .npy file that
+    `load_embeddings` memory-maps.
+    Returns:
+        the .npy path
+    """
+    with gzip.open(embedding_file, "rt") as f:
+        embeddings = np.array(json.load(f), dtype=np.float32)
+
+    npy_path = embeddings_npy_path(embedding_file)
+    # write then rename so concurrent processes never read partial files
+    tmp_path = f"{npy_path}.{os.getpid()}.tmp.npy"
+    np.save(tmp_path, embeddings)
+    os.replace(tmp_path, npy_path)
+    return npy_path
+
+
+def load_embeddings(embedding_file: str) -> Tensor:
+    """Loads word embeddings, memory-mapping the converted .npy file if it
+    exists so that processes share its pages, otherwise parsing the JSON.
+    The .npy is mapped copy-on-write: fine tuning copies only the pages it
+    modifies.
+    Returns:
+        embeddings tensor of size [num_words x embedding_dim]
+    """
+    npy_path = embeddings_npy_path(embedding_file)
+    if os.path.exists(npy_path):
+        return torch.from_numpy(np.load(npy_path, mmap_mode="c"))
+
+    with gzip.open(embedding_file, "rt") as f:
+        return torch.tensor(json.load(f))
+
+
 class InstructionEncoder(nn.Module):
     def __init__(self, config: Config) -> None:
         """An encoder that uses RNN to encode an instruction. Returns
@@ -19,11 +64,18 @@ class InstructionEncoder(nn.Module):
                 hidden_size: The hidden (output) size
                 rnn_type: The RNN cell type.  Must be GRU or LSTM
                 final_state_only: If True, return just the final state
+                cache_rollout_encodings: If True, reuse encodings across
+                    steps of an episode when called without gradients
         """
         super().__init__()
 
         self.config = config
 
+        # per env slot encodings for rollouts, see `_cached_forward`
+        self._cache_inputs: Optional[Tensor] = None
+        self._cache_outputs: Optional[Tensor] = None
+        self._cache_lengths: Optional[Tensor] = None
+
         rnn = nn.GRU if self.config.rnn_type == "GRU" else nn.LSTM
         self.encoder_rnn = rnn(
             input_size=config.embedding_size,
@@ -56,17 +108,91 @@ class InstructionEncoder(nn.Module):
         Returns:
             embeddings tensor of size [num_words x embedding_dim]
         """
-        with gzip.open(self.config.embedding_file, "rt") as f:
-            embeddings = torch.tensor(json.load(f))
-        return embeddings
+        return load_embeddings(self.config.embedding_file)
 
-    def forward(self, observations: Observations) -> Tensor:
+    def forward(
+        self, observations: Observations, masks: Optional[Tensor] = None
+    ) -> Tensor:
         """
         Tensor sizes after computation:
             instruction: [batch_size x seq_length]
             lengths: [batch_size]
             hidden_state: [batch_size x hidden_size]
         """
+        if (
+            masks is not None
+            and self.config.get("cache_rollout_encodings", False)
+            and not torch.is_grad_enabled()
+        ):
+            return self._cached_forward(observations, masks)
+
+        self._cache_inputs = None
+        return self._encode(observations)[0]
+
+    def _input_uuid(self) -> str:
+        if self.config.sensor_uuid == "instruction":
+            return "instruction"
+        return "rxr_instruction"
+
+    def _cached_forward(
+        self, observations: Observations, masks: Tensor
+    ) -> Tensor:
+        """The instruction of an env only changes at episode starts, so
+        rollouts keep the encoding of each env slot and only re-encode the
+        slots that start an episode (mask 0) or whose instruction changed,
+        e.g. after envs are paused. The output equals `_encode`.
+        """
+        uuid = self._input_uuid()
+        instruction = observations[uuid]
+        if (
+            self._cache_inputs is None
+            or self._cache_inputs.shape != instruction.shape
+            or self._cache_inputs.device != instruction.device
+        ):
+            recompute = torch.ones(
+                instruction.shape[0], dtype=torch.bool, device=masks.device
+            )
+            self._cache_inputs = instruction.clone()
+            self._cache_outputs = None
+            self._cache_lengths = torch.zeros(
+                instruction.shape[0], dtype=torch.long
+            )
+        else:
+            recompute = (masks.view(-1) == 0) | (
+                (self._cache_inputs != instruction).flatten(1).any(dim=1)
+            ).to(masks.device)
+
+        if recompute.any():
+            rows = recompute.nonzero(as_tuple=True)[0].to(instruction.device)
+            outputs, lengths = self._encode({uuid: instruction[rows]})
+            if self._cache_outputs is None:
+                # sequence outputs are padded to the longest instruction
+                size = list(outputs.shape)
+                if not self.config.final_state_only:
+                    size[2] = instruction.shape[1]
+                size[0] = instruction.shape[0]
+                self._cache_outputs = outputs.new_zeros(size)
+
+            if self.config.final_state_only:
+                self._cache_outputs[rows] = outputs
+            else:
+                self._cache_outputs[rows] = 0.0
+                self._cache_outputs[rows, :, : outputs.shape[2]] = outputs
+            self._cache_inputs[rows] = instruction[rows]
+            self._cache_lengths[rows.cpu()] = lengths
+
+        if self.config.final_state_only:
+            return self._cache_outputs.clone()
+        return self._cache_outputs[
+            :, :, : int(self._cache_lengths.max())
+        ].clone()
+
+    def _encode(
+        self, observations: Dict[str, Tensor]
+    ) -> Tuple[Tensor, Tensor]:
+        """Returns:
+            the encoding and the instruction lengths (on the CPU)
+        """
         if self.config.sensor_uuid == "instruction":
             instruction = observations["instruction"].long()
             lengths = (instruction != 0.0).long().sum(dim=1)
@@ -87,8 +213,29 @@ class InstructionEncoder(nn.Module):
             final_state = final_state[0]
 
         if self.config.final_state_only:
-            return final_state.squeeze(0)
+            return final_state.squeeze(0), lengths
         else:
-            return nn.utils.rnn.pad_packed_sequence(output, batch_first=True)[
-                0
-            ].permute(0, 2, 1)
+            return (
+                nn.utils.rnn.pad_packed_sequence(output, batch_first=True)[
+                    0
+                ].permute(0, 2, 1),
+                lengths,
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Convert gzipped JSON word embeddings to a .npy file."
+    )
+    parser.add_argument(
+        "--embedding-file",
+        type=str,
+        default="data/datasets/R2R_VLNCE_v1-3_preprocessed/embeddings.json.gz",
+    )
+    args = parser.parse_args()
+    npy_path = convert_embeddings(args.embedding_file)
+    print(f"{args.embedding_file} -> {npy_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -140,7 +140,7 @@ class Seq2SeqNet(Net):
         nn.init.constant_(self.progress_monitor.bias, 0)
 
     def forward(self, observations, rnn_states, prev_actions, masks):
-        instruction_embedding = self.instruction_encoder(observations)
+        instruction_embedding = self.instruction_encoder(observations, masks)
         depth_embedding = self.depth_encoder(observations)
         rgb_embedding = self.rgb_encoder(observations)
 
@@ -324,7 +324,7 @@ class WaypointPredictionNet(Net):
         #  Single Modality Encoding
         # ===========================
 
-        instruction_embedding = self.instruction_encoder(observations)
+        instruction_embedding = self.instruction_encoder(observations, masks)
 
         # encode rgb observations and history
         rgb_obs = torch.cat(
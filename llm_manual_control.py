@@ -19,7 +19,8 @@ from Sub_vlm.observation_collector import ObservationCollector
 class LLMAssistedController:
     """LLM辅助控制器"""
     
-    def __init__(self, output_dir: str, llm_config_path: str = "Sub_vlm/llm_config.yaml", action_space: str = None):
+    def __init__(self, output_dir: str, llm_config_path: str = "Sub_vlm/llm_config.yaml", action_space: str = None,
+                 visualize: bool = True, verbose: bool = True):
         """
         初始化控制器
         
@@ -27,8 +28,12 @@ class LLMAssistedController:
             output_dir: 输出目录
             llm_config_path: LLM配置文件路径
             action_space: 动作空间描述
+            visualize: 是否生成地图可视化和GIF（由EVAL.PROFILE决定）
+            verbose: 是否打印收集器的保存信息
         """
         self.output_dir = output_dir
+        self.visualize = visualize
+        self.verbose = verbose
         self.step_count = 0
         self.subtask_count = 0
         self.episode_id = None
@@ -58,13 +63,17 @@ class LLMAssistedController:
         os.makedirs(self.subtasks_dir, exist_ok=True)
         
         # 创建地图可视化收集器
-        self.map_collector = ObservationCollector(self.observations_dir)
+        self.map_collector = ObservationCollector(
+            self.observations_dir, visualize=self.visualize, verbose=self.verbose
+        )
         self.map_collector.setup_maps_dir(self.episode_dir)
     
     def observe_environment(self, observations: Dict, phase: str) -> Tuple[List[str], List[str]]:
         """收集8方向图像"""
         obs_dir = os.path.join(self.observations_dir, phase)
-        collector = ObservationCollector(obs_dir)
+        collector = ObservationCollector(
+            obs_dir, visualize=self.visualize, verbose=self.verbose
+        )
         
         image_paths, direction_names = collector.collect_8_directions(
             observations, 
@@ -282,9 +291,11 @@ def run_llm_assisted_control(config_path: str,
         return
     
     config = get_config(config_path)
+    # throughput模式下关闭收集器的可视化、GIF和打印
+    headless = config.EVAL.PROFILE == "throughput"
     
-    # 启用地图测量
-    if "TOP_DOWN_MAP_VLNCE" not in config.TASK_CONFIG.TASK.MEASUREMENTS:
+    # 启用地图测量（throughput模式已移除地图测量）
+    if not headless and "TOP_DOWN_MAP_VLNCE" not in config.TASK_CONFIG.TASK.MEASUREMENTS:
         config.TASK_CONFIG.TASK.MEASUREMENTS.append("TOP_DOWN_MAP_VLNCE")
     
     # 加载数据集
@@ -321,7 +332,10 @@ def run_llm_assisted_control(config_path: str,
     # 构建动作空间描述
     action_space = f"MOVE_FORWARD ({forward_step}m), TURN_LEFT ({turn_angle}°), TURN_RIGHT ({turn_angle}°), STOP"
     
-    controller = LLMAssistedController(output_dir, llm_config_path, action_space)
+    controller = LLMAssistedController(
+        output_dir, llm_config_path, action_space,
+        visualize=not headless, verbose=not headless
+    )
     
     # 动作参数
     
@@ -443,7 +457,7 @@ def run_llm_assisted_control(config_path: str,
     print(f"✓ Result saved: {result_file}")
     
     # 生成GIF
-    if controller.map_collector:
+    if controller.map_collector and controller.visualize:
         print("Generating navigation GIF...")
         gif_path = controller.map_collector.save_gif()
         if gif_path:
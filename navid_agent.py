@@ -6,7 +6,9 @@ NaVid 智能体模块
 import os
 import re
 import json
+import time
 import random
+import argparse
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 
@@ -17,8 +19,13 @@ import imageio
 from tqdm import trange
 from habitat import Env
 from habitat.core.agent import Agent
+from habitat.datasets import make_dataset
 from habitat.utils.visualizations import maps
 
+from VLN_CE.habitat_extensions.maps import TopDownMapRenderer
+from VLN_CE.habitat_extensions.utils import render_observations, step_without_observations
+from VLN_CE.vlnce_baselines.config.default import get_config
+
 from navid.constants import IMAGE_TOKEN_INDEX, DEFAULT_IMAGE_TOKEN, DEFAULT_IM_START_TOKEN, DEFAULT_IM_END_TOKEN
 from navid.conversation import conv_templates, SeparatorStyle
 from navid.model.builder import load_pretrained_model
@@ -70,8 +77,15 @@ def evaluate_agent(config, split_id, dataset, model_path, result_path) -> None:
     print(f"即将评估的ID: {evaluating_ids}")
     
     # 初始化环境和智能体
+    # throughput模式：关闭地图可视化、GIF写入和逐步打印，只保留评估指标
+    headless = config.EVAL.PROFILE == "throughput"
     env = Env(config.TASK_CONFIG, dataset)
-    agent = NaVid_Agent(model_path, result_path)
+    agent = NaVid_Agent(
+        model_path, result_path, require_map=not headless, verbose=not headless,
+        macro_action=config.EVAL.MACRO_ACTION.ENABLED,
+        macro_frame_stride=config.EVAL.MACRO_ACTION.FRAME_STRIDE,
+        macro_history_layout=config.EVAL.MACRO_ACTION.HISTORY_LAYOUT,
+    )
     
     num_episodes = len(env.episodes)
     print(f"实际评估 {num_episodes} 个episode")
@@ -195,7 +209,8 @@ class NaVid_Agent(Agent):
     - 分层指令执行（instruction decomposition）
     """
     
-    def __init__(self, model_path, result_path, require_map=True):
+    def __init__(self, model_path, result_path, require_map=True, verbose=True,
+                 macro_action=False, macro_frame_stride=0, macro_history_layout="per_primitive"):
         """
         初始化NaVid智能体
         
@@ -203,11 +218,22 @@ class NaVid_Agent(Agent):
             model_path: 模型权重路径
             result_path: 结果保存路径
             require_map: 是否生成可视化地图视频
+            verbose: 是否打印逐个子任务的执行过程
+            macro_action: 是否以宏动作方式执行一次决策排队的全部底层动作
+            macro_frame_stride: 宏动作中每隔多少个中间动作保留一帧（0表示只保留最后一帧）
+            macro_history_layout: 宏动作下的历史token布局
+                - "per_primitive": 每个底层动作对应一帧历史，未渲染的位姿由最近一帧占位（与训练一致）
+                - "observed": 只使用实际渲染的帧（历史token更少）
         """
         print("Initialize NaVid")
         
         self.result_path = result_path
         self.require_map = require_map
+        self.verbose = verbose
+        self.macro_action = macro_action
+        self.macro_frame_stride = macro_frame_stride
+        assert macro_history_layout in ("per_primitive", "observed"), macro_history_layout
+        self.macro_history_layout = macro_history_layout
         self.conv_mode = "vicuna_v1"
         
         # 创建输出目录
@@ -217,9 +243,7 @@ class NaVid_Agent(Agent):
 
         # 加载预训练模型
         self.model_name = get_model_name_from_path(model_path)
-        self.tokenizer, self.model, self.image_processor, self.context_len = load_pretrained_model(
-            model_path, None, get_model_name_from_path(model_path)
-        )
+        self.tokenizer, self.model, self.image_processor, self.context_len = self.load_model(model_path)
 
         print("Initialization Complete")
 
@@ -229,7 +253,11 @@ class NaVid_Agent(Agent):
         self.history_rgb_tensor = None
         
         self.rgb_list = []
+        # rgb_list中每一帧在历史中占据的底层动作数（宏动作跳过渲染的位姿计入前一帧）
+        self.frame_repeats = []
         self.topdown_map_list = []
+        # 增量渲染俯视地图：每步只重绘轨迹变化的区域（使用Habitat配色）
+        self.map_renderer = TopDownMapRenderer(colorize_fn=maps.colorize_topdown_map)
 
         self.count_id = 0
         
@@ -237,6 +265,18 @@ class NaVid_Agent(Agent):
         self.decomposer = InstructionDecomposer()
         
         self.reset()
+
+    def load_model(self, model_path):
+        """
+        加载预训练模型（子类可替换为桩模型，如基准测试中的ScriptedNaVidAgent）
+
+        Args:
+            model_path: 模型权重路径
+
+        Returns:
+            (tokenizer, model, image_processor, context_len)
+        """
+        return load_pretrained_model(model_path, None, get_model_name_from_path(model_path))
     
     def run_episode(self, env, early_stop_rotation=20, early_stop_steps=500):
         """
@@ -263,27 +303,32 @@ class NaVid_Agent(Agent):
         original_instruction = obs["instruction"]["text"]
         
         # 【步骤1】分解指令为子指令序列
-        print(f"\n{'='*80}")
-        print(f"🎯 原始指令: {original_instruction}")
-        print(f"{'='*80}")
+        if self.verbose:
+            print(f"\n{'='*80}")
+            print(f"🎯 原始指令: {original_instruction}")
+            print(f"{'='*80}")
         sub_instructions = self.decomposer.decompose(original_instruction)
         
         # 总步数计数器
         total_iter_step = 0
         continuse_rotation_count = 0
         last_dtg = 999
+        # 上一次决策实际执行的底层动作数（宏动作模式下可能大于1）
+        num_steps = 1
         
         # 【步骤2】外层循环：遍历每个子指令
         for sub_idx, sub_inst_dict in enumerate(sub_instructions, 1):
             # 提取子指令文本（InstructionDecomposer 保证包含 'sub_instruction' 键）
             sub_instruction = sub_inst_dict['sub_instruction']
             
-            print(f"\n{'─'*80}")
-            print(f"📍 子任务 [{sub_idx}/{len(sub_instructions)}]: {sub_instruction}")
-            print(f"{'─'*80}")
+            if self.verbose:
+                print(f"\n{'─'*80}")
+                print(f"📍 子任务 [{sub_idx}/{len(sub_instructions)}]: {sub_instruction}")
+                print(f"{'─'*80}")
             
             # 【步骤3】重置视觉历史（每个子任务独立）
             self.rgb_list = []
+            self.frame_repeats = []
             self.history_rgb_tensor = None
             
             # 【步骤4】内层循环：执行当前子指令直到stop
@@ -292,7 +337,8 @@ class NaVid_Agent(Agent):
             while True:
                 # 检查episode是否结束（整个任务终止条件）
                 if env.episode_over:
-                    print(f"\n🏁 Episode 结束（完成 {sub_idx}/{len(sub_instructions)} 个子任务，总步数 {total_iter_step}）")
+                    if self.verbose:
+                        print(f"\n🏁 Episode 结束（完成 {sub_idx}/{len(sub_instructions)} 个子任务，总步数 {total_iter_step}）")
                     return total_iter_step
                 
                 info = env.get_metrics()
@@ -302,14 +348,15 @@ class NaVid_Agent(Agent):
                     last_dtg = info["distance_to_goal"]
                     continuse_rotation_count = 0
                 else:
-                    continuse_rotation_count += 1
+                    continuse_rotation_count += num_steps
                 
                 # 获取智能体动作（传递子指令文本）
                 action = self.act(obs, info, env.current_episode.episode_id, sub_instruction=sub_instruction)
                 
                 # 早停条件：过多旋转或超过最大步数
                 if continuse_rotation_count > early_stop_rotation or total_iter_step > early_stop_steps:
-                    print(f"⚠️  触发早停条件（旋转:{continuse_rotation_count}, 总步数:{total_iter_step}）")
+                    if self.verbose:
+                        print(f"⚠️  触发早停条件（旋转:{continuse_rotation_count}, 总步数:{total_iter_step}）")
                     action = {"action": 0}  # 强制停止
                     env.step(action)
                     return total_iter_step
@@ -322,8 +369,11 @@ class NaVid_Agent(Agent):
 
                     break  # 退出内层循环，继续下一个子指令
                 # 执行动作并获取新观测
-
-                obs = env.step(action)
+                if self.macro_action:
+                    obs, num_steps = self.execute_macro_action(env, action)
+                    total_iter_step += num_steps - 1
+                else:
+                    obs = env.step(action)
                 
 
         obs = env.step(action)
@@ -331,6 +381,46 @@ class NaVid_Agent(Agent):
         return total_iter_step
 
 
+    def execute_macro_action(self, env, action):
+        """
+        宏动作执行：连续执行当前动作和队列中剩余的底层动作
+        中间动作不渲染传感器、不加入视觉历史（只更新位姿、指标和步数），
+        只有最后一个动作渲染观测，由下一次act()加入rgb_list。
+        macro_frame_stride > 0 时，每隔macro_frame_stride个中间动作渲染一帧并加入视觉历史。
+        未渲染的位姿计入前一帧的frame_repeats，供per_primitive历史布局使用。
+        episode在中途结束时，在结束位姿补渲染一帧观测。
+        
+        Args:
+            env: Habitat环境对象
+            action: act()返回的动作字典（非stop）
+            
+        Returns:
+            obs: 最后一个执行动作后的观测
+            num_steps: 实际执行的底层动作数
+        """
+        actions = [action["action"]] + self.pending_action_list
+        self.pending_action_list = []
+
+        obs = None
+        num_steps = 0
+        for i, temp_action in enumerate(actions):
+            num_steps += 1
+            is_last = i == len(actions) - 1
+            keep_frame = self.macro_frame_stride > 0 and (i + 1) % self.macro_frame_stride == 0
+            if is_last or keep_frame:
+                obs = env.step({"action": temp_action})
+                if not is_last:
+                    self.rgb_list.append(obs["rgb"])
+                    self.frame_repeats.append(1)
+            else:
+                step_without_observations(env, temp_action)
+                self.frame_repeats[-1] += 1
+                if env.episode_over:
+                    obs = render_observations(env)
+            if env.episode_over:
+                break
+        return obs, num_steps
+
     def process_images(self, rgb_list):
         """
         增量式图像处理：只处理新增图像，复用历史视觉token
@@ -356,6 +446,12 @@ class NaVid_Agent(Agent):
             self.history_rgb_tensor = video
         else:
             self.history_rgb_tensor = torch.cat((self.history_rgb_tensor, video), dim=0)
+
+        # 宏动作 + per_primitive布局：按每帧占据的底层动作数重复，保持训练时每个底层动作一帧的历史长度
+        # 重复的是已预处理的张量，跳过的位姿不需要渲染和预处理
+        if self.macro_action and self.macro_history_layout == "per_primitive":
+            repeats = torch.tensor(self.frame_repeats, device=self.history_rgb_tensor.device)
+            return [torch.repeat_interleave(self.history_rgb_tensor, repeats, dim=0)]
         
         return [self.history_rgb_tensor]
 
@@ -560,7 +656,9 @@ class NaVid_Agent(Agent):
         self.history_rgb_tensor = None
         self.transformation_list = []
         self.rgb_list = []
+        self.frame_repeats = []
         self.topdown_map_list = []
+        self.map_renderer.reset()
         self.count_id += 1
         self.pending_action_list = []
 
@@ -587,13 +685,14 @@ class NaVid_Agent(Agent):
         self.episode_id = episode_id
         rgb = observations["rgb"]
         self.rgb_list.append(rgb)
+        self.frame_repeats.append(1)
         
         # 确定使用的指令文本（子指令优先，否则使用原始指令）
         instruction_text = sub_instruction if sub_instruction is not None else observations["instruction"]["text"]
 
         # 生成可视化地图
         if self.require_map:
-            top_down_map = maps.colorize_draw_agent_and_fit_to_height(info["top_down_map_vlnce"], rgb.shape[0])
+            top_down_map = self.map_renderer.render(info["top_down_map_vlnce"], rgb.shape[0])
             output_im = np.concatenate((rgb, top_down_map), axis=1)
 
         # 【动作缓存机制】避免每步都调用耗时的VLM推理
@@ -656,3 +755,92 @@ class NaVid_Agent(Agent):
         # 返回队列中的第一个动作，剩余动作留在缓存中
         return {"action": self.pending_action_list.pop(0)}
 
+
+class ScriptedNaVidAgent(NaVid_Agent):
+    """用桩模型代替VLM的NaVid智能体：推理固定输出，其余（动作队列、地图渲染、GIF写入）保持不变"""
+
+    def load_model(self, model_path):
+        return None, None, None, 0
+
+    def predict_inference(self, prompt):
+        return "move forward 75 cm."
+
+
+def benchmark_eval_profile(exp_config, profile, num_episodes, max_steps, result_path, opts=None):
+    """
+    评估模式基准测试：在指定评估模式下运行若干episode
+    模型推理用固定输出代替，只测量环境步进与可视化相关的开销
+
+    Returns:
+        (总步数, 总耗时)
+    """
+    config = get_config(exp_config, ["EVAL.PROFILE", profile] + (opts or []))
+    dataset = make_dataset(id_dataset=config.TASK_CONFIG.DATASET.TYPE, config=config.TASK_CONFIG.DATASET)
+    dataset.episodes.sort(key=lambda ep: ep.episode_id)
+    dataset.episodes = dataset.episodes[:num_episodes]
+
+    headless = config.EVAL.PROFILE == "throughput"
+    env = Env(config.TASK_CONFIG, dataset)
+    agent = ScriptedNaVidAgent(
+        "scripted", result_path, require_map=not headless, verbose=not headless,
+        macro_action=config.EVAL.MACRO_ACTION.ENABLED,
+        macro_frame_stride=config.EVAL.MACRO_ACTION.FRAME_STRIDE,
+        macro_history_layout=config.EVAL.MACRO_ACTION.HISTORY_LAYOUT,
+    )
+
+    total_steps = 0
+    start = time.time()
+    for _ in range(len(env.episodes)):
+        obs = env.reset()
+        agent.reset()
+        steps = 0
+        while not env.episode_over and steps < max_steps:
+            info = env.get_metrics()
+            action = agent.act(obs, info, env.current_episode.episode_id)
+            if agent.macro_action and action["action"] != 0:
+                obs, num_steps = agent.execute_macro_action(env, action)
+            else:
+                obs, num_steps = env.step(action), 1
+            steps += num_steps
+        total_steps += steps
+    # 最后一个episode的GIF在reset时写出
+    agent.reset()
+    elapsed = time.time() - start
+
+    env.close()
+    return total_steps, elapsed
+
+
+def main():
+    """
+    对比 default 与 throughput 两种评估模式下的环境步进 + 可视化开销
+
+    用法:
+        python navid_agent.py --exp-config VLN_CE/vlnce_baselines/config/r2r_baselines/navid_r2r.yaml
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--exp-config", type=str, required=True, help="path to config yaml")
+    parser.add_argument("--num-episodes", type=int, default=5, help="episodes per profile")
+    parser.add_argument("--max-steps", type=int, default=100, help="max steps per episode")
+    parser.add_argument("--result-path", type=str, default="/tmp/navid_profile_benchmark", help="where GIFs are written")
+    parser.add_argument("--macro-action", action="store_true", help="execute queued primitives as macro actions")
+    parser.add_argument("--frame-stride", type=int, default=0, help="history frame stride of macro actions")
+    args = parser.parse_args()
+    opts = [
+        "EVAL.MACRO_ACTION.ENABLED", args.macro_action,
+        "EVAL.MACRO_ACTION.FRAME_STRIDE", args.frame_stride,
+    ]
+
+    results = {}
+    for profile in ["default", "throughput"]:
+        steps, elapsed = benchmark_eval_profile(
+            args.exp_config, profile, args.num_episodes, args.max_steps, args.result_path, opts
+        )
+        results[profile] = steps / max(elapsed, np.finfo(float).eps)
+        print(f"{profile:12s}: {steps} steps in {elapsed:.2f}s ({results[profile]:.2f} steps/s)")
+
+    print(f"Speedup (throughput / default): {results['throughput'] / results['default']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -53,11 +53,19 @@ def main():
 
     )
 
+    parser.add_argument(
+        "--profile",
+        type=str,
+        choices=["default", "throughput"],
+        default=None,
+        help="evaluation profile; throughput disables all visualization work"
+    )
+
     args = parser.parse_args()
     run_exp(**vars(args))
 
 
-def run_exp(exp_config: str, split_num: str, split_id: str, model_path: str, result_path: str, opts=None) -> None:
+def run_exp(exp_config: str, split_num: str, split_id: str, model_path: str, result_path: str, profile: str = None, opts=None) -> None:
     """Runs experiment given mode and config
 
     Args:
@@ -66,9 +74,12 @@ def run_exp(exp_config: str, split_num: str, split_id: str, model_path: str, res
         split_id: 当前分块ID
         model_path: 模型权重文件路径
         result_path: 结果保存路径
+        profile: 评估模式（default / throughput），None时使用配置文件中的EVAL.PROFILE
         opts: 额外的配置选项列表
     """
-    # 加载配置文件
+    # 加载配置文件（命令行指定的profile覆盖配置文件）
+    if profile is not None:
+        opts = (opts or []) + ["EVAL.PROFILE", profile]
     config = get_config(exp_config, opts)
     
     # 创建数据集并按episode ID排序